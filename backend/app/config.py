@@ -5,6 +5,20 @@ from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# Схема URL синхронного драйвера -> асинхронного (для DB_URL)
+ASYNC_DRIVERS = {
+    "mysql+pymysql://": "mysql+aiomysql://",
+    "mysql://": "mysql+aiomysql://",
+    "sqlite:///": "sqlite+aiosqlite:///",
+}
+
+
+def to_async_url(url: str) -> str:
+    for sync_prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
 
 class Settings(BaseSettings):
     """Settings loaded from environment variables."""
@@ -31,19 +45,117 @@ class Settings(BaseSettings):
     mysql_user: str = "app"
     mysql_password: str = ""
     mysql_database: str = "english_lessons"
+    # Полный URL БД вместо MYSQL_* (например sqlite:///./dev.db — локально и в бенчмарках)
+    db_url: str = ""
 
     @property
     def database_url(self) -> str:
+        if self.db_url:
+            return self.db_url
         return (
             f"mysql+pymysql://{self.mysql_user}:{self.mysql_password}"
             f"@{self.mysql_host}:{self.mysql_port}/{self.mysql_database}"
         )
 
+    @property
+    def async_database_url(self) -> str:
+        """Та же БД для асинхронного движка (драйвер aiomysql / aiosqlite)."""
+        return to_async_url(self.database_url)
+
+    # Реплика только для чтения (синхронный URL, как DB_URL); пусто — всё читается с основной БД.
+    # После записи клиент read_your_writes секунд читает с основной (cookie); после ошибки
+    # реплики чтения идут на основную retry секунд; connect_timeout — только MySQL
+    db_replica_url: str = ""
+    db_replica_read_your_writes_seconds: float = 5.0
+    db_replica_retry_seconds: float = 30.0
+    db_replica_connect_timeout: int = 2
+
+    @property
+    def async_replica_url(self) -> str:
+        return to_async_url(self.db_replica_url) if self.db_replica_url else ""
+
+    # Readiness (/readyz): период фоновой проверки и таймаут запроса к БД, сек
+    readiness_interval: float = 5.0
+    readiness_db_timeout: float = 2.0
+
+    # HTTP-метрики: границы гистограммы длительности (сек) и пути, которые не учитываются
+    http_duration_buckets: list[float] = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+    metrics_exclude_paths: list[str] = ["/metrics", "/static"]
+
+    # SQL: порог медленного запроса (мс) для лога; повторов одного запроса за HTTP-запрос,
+    # после которых запрос помечается как N+1; предел числа отпечатков в метриках
+    slow_query_ms: float = 200.0
+    n_plus_one_threshold: int = 10
+    sql_metrics_max_fingerprints: int = 300
+
+    # Пул соединений (на каждый движок: синхронный и асинхронный).
+    # pre_ping — проверка соединения перед выдачей (лишний round trip на checkout);
+    # без него обрыв обнаруживается ошибкой запроса, и пул сбрасывает устаревшие соединения.
+    db_pool_size: int = 5
+    db_pool_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 300
+    db_pool_pre_ping: bool = True
+
     # Paths (for Docker/K8s: templates and temp files)
     templates_dir: str = "templates"
     report_template_name: str = "report_template.docx"
     temp_dir: str = "/tmp"
 
+    # Кэш списка студентов: сброс при создании; TTL (сек) — предел устаревания между репликами, 0 — без TTL
+    student_list_cache_ttl: float = 30.0
+    # Полный список (без limit/cursor/q): не больше стольких строк, продолжение — по X-Next-Cursor
+    student_list_max_rows: int = 5000
+
+    # Постраничный список студентов: максимальный limit
+    student_page_max_limit: int = 200
+
+    # Массовый импорт занятий (POST /api/lessons/bulk): строк в одном executemany
+    lesson_bulk_batch_size: int = 500
+
+    # Конвертация docx -> pdf: пул долгоживущих процессов LibreOffice
+    libreoffice_binary: str = "libreoffice"
+    # Системный python с модулем uno (пакет python3-uno), на нём работают воркеры пула
+    converter_python: str = "/usr/bin/python3"
+    converter_pool_size: int = 1  # 0 — без пула: отдельный запуск LibreOffice на каждый отчёт
+    converter_queue_depth: int = 8  # сколько запросов может ждать свободного воркера
+    converter_timeout: float = 60.0  # секунды на одну конвертацию (и на ожидание воркера)
+    converter_max_conversions: int = 50  # после стольких конвертаций воркер перезапускается
+
+    # Подстановка в шаблон .docx: ooxml — прямая запись XML; docx — через python-docx
+    report_template_engine: str = "ooxml"
+
+    # Движок PDF: libreoffice (шаблон .docx) или native (встроенный, без LibreOffice)
+    report_engine: str = "libreoffice"
+    report_engine_fallback: bool = True  # native, если LibreOffice или шаблон недоступны
+    report_font_path: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+    report_font_bold_path: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+    # Кэш готовых PDF (ключ — хэш данных отчёта и версии шаблона)
+    report_cache_max_entries: int = 128
+    report_cache_max_bytes: int = 64 * 1024 * 1024
+    report_cache_disk_enabled: bool = False  # второй уровень: файлы в temp_dir/report_cache
+    report_cache_disk_max_bytes: int = 512 * 1024 * 1024
+
+    # Пакетная выгрузка отчётов за месяц (ZIP): сколько документов на один вызов конвертера
+    report_batch_size: int = 10
+
+    # Допуск к формированию отчётов: одновременно формируемых PDF на процесс (0 — без предела),
+    # HTTP-запросов в очереди и сколько секунд они ждут слот; сверх — 503 с Retry-After.
+    # Token bucket на клиента: отчётов в минуту и запас подряд (0 в минуту — без лимита), сверх — 429.
+    # client_header — заголовок с адресом клиента за прокси (X-Forwarded-For); пусто — адрес соединения
+    report_max_concurrency: int = 2
+    report_queue_depth: int = 16
+    report_queue_timeout: float = 30.0
+    report_rate_per_minute: float = 20.0
+    report_rate_burst: int = 5
+    report_client_header: str = ""
+
+    # Асинхронные задания на отчёты (POST /api/report/jobs)
+    report_job_workers: int = 2  # одновременно формируемых отчётов
+    report_job_queue_depth: int = 50  # заданий в очереди, сверх — 503
+    report_job_ttl: int = 600  # секунд хранения готового PDF
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -1,13 +1,41 @@
-"""Database connection and session management (MySQL via SQLAlchemy)."""
+"""
+Database connection and session management (MySQL via SQLAlchemy).
 
-from sqlalchemy import create_engine, func, select
+Обработчики API работают через асинхронный движок (aiomysql): запрос, ждущий БД,
+не занимает поток, параллелизм ограничен пулом соединений. Синхронный движок
+(pymysql) остаётся для init_db и фоновых задач вне event loop. Если задан
+DB_REPLICA_URL, обработчики чтения получают сессию реплики (см. app/db_routing.py).
+
+Старт: init_db сверяет версию схемы (таблица schema_version) с SCHEMA_VERSION и,
+если БД уже доведена до неё, не выполняет create_all, проверку индексов и наполнение.
+Версия записывается только после успеха всех шагов: если какой-то индекс не создан,
+приложение стартует, но на следующем старте миграция повторяется.
+"""
+
+import structlog
+from sqlalchemy import create_engine, delete, event, func, inspect, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from app.config import get_settings
+from app.db_instrumentation import instrument_statements
+from app.db_pool import instrument_pool, pool_options
+from app.metrics import db_replica_up
+
+log = structlog.get_logger()
+
+# Увеличивать при изменении таблиц или индексов моделей: на следующем старте
+# выполнятся create_all, создание недостающих индексов и наполнение
+SCHEMA_VERSION = 2
 
 Base = declarative_base()
 _engine = None
 _SessionLocal = None
+_async_engine: AsyncEngine | None = None
+_AsyncSessionLocal = None
+_replica_engine: AsyncEngine | None = None
+_ReplicaSessionLocal = None
 
 
 def get_engine():
@@ -16,13 +44,33 @@ def get_engine():
         settings = get_settings()
         _engine = create_engine(
             settings.database_url,
-            pool_pre_ping=True,
-            pool_recycle=300,
             echo=settings.debug,
+            connect_args=_connect_args(settings.database_url),
+            **pool_options(),
         )
+        _setup_sqlite(_engine)
+        instrument_pool(_engine, "sync")
+        instrument_statements(_engine)
     return _engine
 
 
+def _connect_args(url: str) -> dict:
+    # SQLite (DB_URL): соединение используется из разных потоков пула
+    return {"check_same_thread": False} if url.startswith("sqlite") else {}
+
+
+def _setup_sqlite(engine) -> None:
+    """SQLite по умолчанию не проверяет внешние ключи — на них опирается upsert занятий."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _enable_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
 def get_session_factory():
     global _SessionLocal
     if _SessionLocal is None:
@@ -34,11 +82,128 @@ def get_session_factory():
     return _SessionLocal
 
 
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        settings = get_settings()
+        _async_engine = create_async_engine(
+            settings.async_database_url,
+            echo=settings.debug,
+            **pool_options(async_engine=True),
+        )
+        _setup_sqlite(_async_engine.sync_engine)
+        instrument_pool(_async_engine.sync_engine, "async")
+        instrument_statements(_async_engine.sync_engine)
+    return _async_engine
+
+
+def get_async_session_factory():
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        _AsyncSessionLocal = async_sessionmaker(
+            bind=get_async_engine(),
+            autoflush=False,
+            # Объекты читаются после commit (ответ API) — без повторного SELECT
+            expire_on_commit=False,
+        )
+    return _AsyncSessionLocal
+
+
+def get_replica_engine() -> AsyncEngine | None:
+    """Асинхронный движок реплики; None — реплика не настроена."""
+    global _replica_engine
+    settings = get_settings()
+    if _replica_engine is None and settings.db_replica_url:
+        url = settings.async_replica_url
+        # Недоступная реплика должна быстро уступать основной БД, а не ждать TCP-таймаута
+        connect_args = {"connect_timeout": settings.db_replica_connect_timeout} if url.startswith("mysql") else {}
+        _replica_engine = create_async_engine(
+            url,
+            echo=settings.debug,
+            connect_args=connect_args,
+            **pool_options(async_engine=True, replica=True),
+        )
+        _setup_sqlite(_replica_engine.sync_engine)
+        instrument_pool(_replica_engine.sync_engine, "replica")
+        instrument_statements(_replica_engine.sync_engine)
+        db_replica_up.set(1)
+    return _replica_engine
+
+
+def get_replica_session_factory():
+    global _ReplicaSessionLocal
+    if _ReplicaSessionLocal is None:
+        engine = get_replica_engine()
+        if engine is None:
+            return None
+        _ReplicaSessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    return _ReplicaSessionLocal
+
+
+async def dispose_async_engine() -> None:
+    """Закрыть соединения асинхронных пулов — основного и реплики (shutdown приложения)."""
+    global _async_engine, _AsyncSessionLocal, _replica_engine, _ReplicaSessionLocal
+    engines = (_async_engine, _replica_engine)
+    _async_engine = _AsyncSessionLocal = _replica_engine = _ReplicaSessionLocal = None
+    for engine in engines:
+        if engine is not None:
+            await engine.dispose()
+
+
 def init_db() -> None:
-    """Create tables if they do not exist and add start data (students) if empty."""
-    from app.models import Student, lesson, student  # noqa: F401
+    """
+    Create tables if they do not exist and add start data (students) if empty.
+    Пропускается целиком, если версия схемы в БД не ниже SCHEMA_VERSION (один SELECT).
+    """
+    import app.models  # noqa: F401 — регистрирует все таблицы в Base.metadata
+
+    engine = get_engine()
+    current = _get_schema_version(engine)
+    if current is not None and current >= SCHEMA_VERSION:
+        log.info("Database schema is current", version=current)
+        return
+
+    Base.metadata.create_all(bind=engine)
+    failed_indexes = _ensure_indexes()
+    _seed()
+    if failed_indexes:
+        log.error(
+            "Database schema incomplete, version not updated; will retry on next start",
+            version=current,
+            failed_indexes=failed_indexes,
+        )
+        return
+    _set_schema_version()
+    log.info("Database schema bootstrapped", version=SCHEMA_VERSION, previous=current)
+
+
+def _get_schema_version(engine) -> int | None:
+    """Версия схемы из БД; None — таблицы schema_version ещё нет (или она пуста)."""
+    from app.models import SchemaVersion
+
+    try:
+        with engine.connect() as conn:
+            return conn.scalar(select(SchemaVersion.version).where(SchemaVersion.id == 1))
+    except SQLAlchemyError:
+        return None
+
 
-    Base.metadata.create_all(bind=get_engine())
+def _set_schema_version() -> None:
+    from app.models import SchemaVersion
+
+    with get_session_factory()() as session:
+        row = session.get(SchemaVersion, 1)
+        if row is None:
+            session.add(SchemaVersion(id=1, version=SCHEMA_VERSION))
+        else:
+            row.version = SCHEMA_VERSION
+            row.applied_at = func.now()
+        session.commit()
+
+
+def _seed() -> None:
+    from app.models import LessonRecord, Student, StudentYearSummary
+    from app.services.summary import backfill_year_summaries
 
     # Стартовые данные: ученики (русский + иврит), только если таблица пуста
     SessionLocal = get_session_factory()
@@ -58,3 +223,63 @@ def init_db() -> None:
                     )
                 )
             session.commit()
+
+        # Годовые сводки: таблица появилась позже lesson_records — строим по имеющимся занятиям
+        if (
+            session.scalar(select(func.count()).select_from(StudentYearSummary)) == 0
+            and session.scalar(select(func.count()).select_from(LessonRecord)) > 0
+        ):
+            backfill_year_summaries(session)
+            session.commit()
+            log.info("Student year summaries backfilled")
+
+
+def _ensure_indexes() -> list[str]:
+    """
+    create_all не добавляет индексы в уже существующие таблицы — создаём недостающие.
+    Возвращает имена индексов, которые создать не удалось.
+    """
+    engine = get_engine()
+    inspector = inspect(engine)
+    failed = []
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        existing |= {constraint["name"] for constraint in inspector.get_unique_constraints(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                if index.unique and table.name == "lesson_records":
+                    _dedupe_lesson_records(engine)
+                index.create(bind=engine)
+                log.info("Index created", table=table.name, index=index.name)
+            except SQLAlchemyError as e:
+                log.error("Cannot create index", table=table.name, index=index.name, error=str(e))
+                failed.append(index.name)
+    return failed
+
+
+def _dedupe_lesson_records(engine) -> None:
+    """
+    Перед уникальным индексом (student_id, year, month): из повторов остаётся последняя
+    сохранённая запись (наибольший id), сводки пересчитываются. Иначе индекс не создать,
+    а upsert без него добавляет дубли вместо обновления.
+    """
+    from app.models import LessonRecord
+    from app.services.summary import backfill_year_summaries
+
+    # Производная таблица с GROUP BY материализуется — MySQL разрешает DELETE из той же таблицы
+    keep = (
+        select(func.max(LessonRecord.id).label("id"))
+        .group_by(LessonRecord.student_id, LessonRecord.year, LessonRecord.month)
+        .subquery()
+    )
+    with get_session_factory()() as session:
+        deleted = session.execute(
+            delete(LessonRecord).where(LessonRecord.id.not_in(select(keep.c.id)))
+        ).rowcount
+        if deleted:
+            backfill_year_summaries(session)
+        session.commit()
+    if deleted:
+        log.warning("Duplicate lesson records removed", count=deleted)
@@ -0,0 +1,141 @@
+"""
+Инструментирование SQL на уровне движка (события before/after_cursor_execute).
+
+Каждый запрос сводится к отпечатку (fingerprint): литералы и списки IN заменяются на ?,
+пробелы схлопываются — так запросы одной формы попадают в одну серию метрик
+(длительность и число строк). Медленные запросы (slow_query_ms) пишутся в лог —
+request_id добавляется из контекста structlog. Запросы одного HTTP-запроса
+считаются (RequestQueryStats): много повторов одного отпечатка — признак N+1.
+Намеренные повторы (пачки массового импорта) помечаются batched_statements().
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import structlog
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+from app.metrics import db_statement_duration_seconds, db_statement_rows
+
+log = structlog.get_logger()
+
+OTHER_FINGERPRINT = "<other>"
+MAX_FINGERPRINT_LENGTH = 200
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\([^)]+\)s|%s|\?|:\w+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_IN_TUPLES = re.compile(r"\bIN\s*\(\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*(\((?:[^()]*)\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Нормализованный текст запроса без значений."""
+    text = _STRING_LITERAL.sub("?", statement)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _IN_LIST.sub("IN (?)", text)
+    text = _IN_TUPLES.sub(r"IN (\1)", text)
+    text = _VALUES_LIST.sub(r"VALUES \1", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    if len(text) > MAX_FINGERPRINT_LENGTH:
+        # Длинные запросы различаются хвостом (WHERE, ORDER BY) — добавляем хэш полного текста
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:8]
+        text = f"{text[:MAX_FINGERPRINT_LENGTH - 12]}… #{digest}"
+    return text
+
+
+@dataclass
+class RequestQueryStats:
+    """Запросы к БД в рамках одного HTTP-запроса."""
+
+    count: int = 0
+    duration: float = 0.0
+    by_fingerprint: Counter = field(default_factory=Counter)
+
+    def add(self, fingerprint_: str, duration: float, batched: bool = False) -> None:
+        self.count += 1
+        self.duration += duration
+        if not batched:
+            self.by_fingerprint[fingerprint_] += 1
+
+
+_request_stats: ContextVar[RequestQueryStats | None] = ContextVar("request_query_stats", default=None)
+_batched: ContextVar[bool] = ContextVar("batched_statements", default=False)
+
+_known_fingerprints: set[str] = set()
+_known_lock = threading.Lock()
+
+
+def start_request_stats() -> RequestQueryStats:
+    stats = RequestQueryStats()
+    _request_stats.set(stats)
+    return stats
+
+
+@contextmanager
+def batched_statements() -> Iterator[None]:
+    """Запросы блока повторяются по пачкам намеренно: в счёт запросов идут, в признак N+1 — нет."""
+    token = _batched.set(True)
+    try:
+        yield
+    finally:
+        _batched.reset(token)
+
+
+def _metric_label(fingerprint_: str) -> str:
+    """Ограничение кардинальности: сверх sql_metrics_max_fingerprints — <other>."""
+    if fingerprint_ in _known_fingerprints:
+        return fingerprint_
+    with _known_lock:
+        if len(_known_fingerprints) < get_settings().sql_metrics_max_fingerprints:
+            _known_fingerprints.add(fingerprint_)
+            return fingerprint_
+    return OTHER_FINGERPRINT
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    fp = fingerprint(statement)
+    label = _metric_label(fp)
+    db_statement_duration_seconds.labels(fingerprint=label).observe(duration)
+    rows = cursor.rowcount
+    if rows is not None and rows >= 0:
+        db_statement_rows.labels(fingerprint=label).observe(rows)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(fp, duration, batched=_batched.get())
+
+    if duration * 1000 >= get_settings().slow_query_ms:
+        log.warning(
+            "Slow query",
+            fingerprint=fp,
+            duration_ms=round(duration * 1000, 2),
+            rows=rows,
+            executemany=executemany,
+        )
+
+
+def instrument_statements(engine: Engine) -> None:
+    """Подписаться на выполнение запросов движка (для async — engine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,90 @@
+"""
+Пул соединений с БД: настройки и метрики Prometheus.
+
+Размер, overflow, timeout, recycle и pre-ping задаются настройками db_pool_*.
+Метрики ведутся отдельно для каждого движка (метка engine: sync, async, replica).
+Занятые соединения, overflow и время ожидания соединения снимает подкласс QueuePool
+вокруг выдачи и возврата (событие checkin приходит до возврата в пул, а ожидание
+в событиях не видно вовсе; время ожидания включает открытие нового соединения,
+если пул ещё не заполнен). Инвалидации — из событий пула.
+"""
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import get_settings
+from app.metrics import (
+    db_pool_checked_out,
+    db_pool_checkout_wait_seconds,
+    db_pool_invalidations_total,
+    db_pool_overflow,
+    db_pool_size,
+)
+
+
+class _MetricsPoolMixin:
+    metrics_label = ""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait_seconds.labels(engine=self.metrics_label).observe(time.perf_counter() - start)
+            self._update_gauges()
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        db_pool_checked_out.labels(engine=self.metrics_label).set(self.checkedout())
+        db_pool_overflow.labels(engine=self.metrics_label).set(max(self.overflow(), 0))
+
+
+class MetricsQueuePool(_MetricsPoolMixin, QueuePool):
+    metrics_label = "sync"
+
+
+class MetricsAsyncQueuePool(_MetricsPoolMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+class MetricsReplicaQueuePool(_MetricsPoolMixin, AsyncAdaptedQueuePool):
+    metrics_label = "replica"
+
+
+def pool_options(async_engine: bool = False, replica: bool = False) -> dict:
+    """Аргументы create_engine / create_async_engine для пула (реплика — только асинхронная)."""
+    settings = get_settings()
+    if replica:
+        poolclass = MetricsReplicaQueuePool
+    else:
+        poolclass = MetricsAsyncQueuePool if async_engine else MetricsQueuePool
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_pool_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def instrument_pool(engine: Engine, label: str) -> None:
+    """Подписать метрики инвалидаций на события пула (для async — engine.sync_engine)."""
+
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        db_pool_invalidations_total.labels(engine=label, reason="error" if exception else "explicit").inc()
+
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        db_pool_invalidations_total.labels(engine=label, reason="soft").inc()
+
+    db_pool_size.labels(engine=label).set(engine.pool.size())
+    event.listen(engine, "invalidate", on_invalidate)
+    event.listen(engine, "soft_invalidate", on_soft_invalidate)
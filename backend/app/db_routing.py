@@ -0,0 +1,131 @@
+"""
+Маршрутизация чтения между основной БД и репликой (DB_REPLICA_URL).
+
+Обработчики только для чтения получают сессию через get_read_db (app/deps.py);
+запись и всё остальное — через get_db, всегда на основную БД. Сессия чтения
+идёт на основную БД, если:
+- реплика не настроена (no_replica);
+- клиент недавно писал (recent_write) — cookie, выставленная remember_write,
+  закрывает окно отставания репликации для него самого;
+- реплика недавно отвечала ошибкой (replica_down) — db_replica_retry_seconds;
+- соединение с репликой не открылось (replica_error).
+Разрыв соединения во время запроса к реплике тоже выводит её из работы на retry-окно,
+а обработчик (маршруты с route_class=ReplicaFallbackRoute) один раз повторяется
+на основной БД (replica_retry) — клиент не получает 500 из-за реплики.
+Фоновая проверка готовности возвращает реплику раньше, как только та отвечает.
+"""
+
+import math
+import time
+from typing import Any, Callable, Coroutine
+
+import structlog
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import get_async_session_factory, get_replica_session_factory
+from app.metrics import db_read_route_total, db_replica_up
+
+log = structlog.get_logger()
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+_replica_down_until = 0.0
+
+
+def replica_available() -> bool:
+    return time.monotonic() >= _replica_down_until
+
+
+def mark_replica_down(error: BaseException) -> None:
+    """Не читать с реплики db_replica_retry_seconds секунд."""
+    global _replica_down_until
+    if replica_available():
+        log.warning("Replica unavailable, reading from primary", error=str(error).replace("\n", " ").strip())
+    _replica_down_until = time.monotonic() + get_settings().db_replica_retry_seconds
+    db_replica_up.set(0)
+
+
+def mark_replica_up() -> None:
+    global _replica_down_until
+    if not replica_available():
+        log.info("Replica is back")
+    _replica_down_until = 0.0
+    db_replica_up.set(1)
+
+
+def _recent_write(cookie: str | None) -> bool:
+    try:
+        return cookie is not None and float(cookie) > time.time()
+    except ValueError:
+        return False
+
+
+def remember_write(response: Response) -> None:
+    """После записи: этот клиент читает с основной БД, пока реплика может отставать."""
+    settings = get_settings()
+    window = settings.db_replica_read_your_writes_seconds
+    if not settings.db_replica_url or window <= 0:
+        return
+    response.set_cookie(
+        READ_PRIMARY_COOKIE,
+        f"{time.time() + window:.3f}",
+        max_age=math.ceil(window),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def _primary(reason: str) -> tuple[AsyncSession, str]:
+    db_read_route_total.labels(target="primary", reason=reason).inc()
+    return get_async_session_factory()(), "primary"
+
+
+async def open_read_session(
+    read_primary_cookie: str | None, replica_failed: bool = False
+) -> tuple[AsyncSession, str]:
+    """Сессия для чтения и её цель: replica или primary (replica_failed — повтор после обрыва реплики)."""
+    ReplicaSession = get_replica_session_factory()
+    if ReplicaSession is None:
+        return _primary("no_replica")
+    if replica_failed:
+        return _primary("replica_retry")
+    if _recent_write(read_primary_cookie):
+        return _primary("recent_write")
+    if not replica_available():
+        return _primary("replica_down")
+
+    session = ReplicaSession()
+    try:
+        # Соединение берётся сразу: ошибка реплики — ещё до запроса обработчика
+        await session.connection()
+    except (DBAPIError, OSError) as e:
+        await session.close()
+        mark_replica_down(e)
+        return _primary("replica_error")
+    db_read_route_total.labels(target="replica", reason="replica").inc()
+    return session, "replica"
+
+
+class ReplicaFallbackRoute(APIRoute):
+    """
+    Маршрут, обработчик которого повторяется один раз на основной БД, если чтение
+    с реплики оборвалось (get_read_db отмечает это в request.state.replica_failed).
+    Только для маршрутов без побочных эффектов до чтения: обработчик выполняется заново.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            try:
+                return await handler(request)
+            except (OperationalError, InterfaceError):
+                if not getattr(request.state, "replica_failed", False):
+                    raise
+            return await handler(request)
+
+        return route_handler
@@ -1,17 +1,38 @@
 """FastAPI dependencies (DB session, etc.)."""
 
-from typing import Generator
+from typing import AsyncGenerator
 
-from sqlalchemy.orm import Session
+from fastapi import Request
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_session_factory
+from app.database import get_async_session_factory
+from app.db_routing import READ_PRIMARY_COOKIE, mark_replica_down, open_read_session
 
 
-def get_db() -> Generator[Session, None, None]:
-    """Dependency that yields a DB session and closes it after request."""
-    SessionLocal = get_session_factory()
-    session = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency that yields an async DB session and closes it after request."""
+    AsyncSessionLocal = get_async_session_factory()
+    async with AsyncSessionLocal() as session:
         yield session
-    finally:
-        session.close()
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия только для чтения: реплика, если настроена и доступна, иначе основная БД.
+    Обрыв реплики посреди запроса: ReplicaFallbackRoute повторяет обработчик, и эта же
+    зависимость отдаёт сессию основной БД.
+    """
+    session, target = await open_read_session(
+        request.cookies.get(READ_PRIMARY_COOKIE),
+        replica_failed=getattr(request.state, "replica_failed", False),
+    )
+    async with session:
+        try:
+            yield session
+        except (OperationalError, InterfaceError) as e:
+            # Обрыв соединения с репликой посреди запроса: следующие чтения — с основной
+            if target == "replica":
+                mark_replica_down(e)
+                request.state.replica_failed = True
+            raise
@@ -0,0 +1,9 @@
+"""Условные HTTP-запросы: сравнение ETag с If-None-Match (общий код роутеров)."""
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Проверка заголовка If-None-Match (список ETag через запятую или «*»)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
@@ -0,0 +1,71 @@
+"""
+Отдача файлов роутерами: ответ из временного каталога и диапазоны (Range) для байтов в памяти.
+
+Файлы отдаёт FileResponse Starlette — потоком по частям (или sendfile, если сервер
+поддерживает расширение zerocopysend), с HEAD и Range.
+"""
+
+import re
+import shutil
+from pathlib import Path
+
+import anyio.to_thread
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+_BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class TempDirFileResponse(FileResponse):
+    """FileResponse, который удаляет временный каталог после ответа — и при обрыве соединения."""
+
+    def __init__(self, path: Path, temp_dir: Path, **kwargs):
+        super().__init__(path, **kwargs)
+        self.temp_dir = temp_dir
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await anyio.to_thread.run_sync(shutil.rmtree, self.temp_dir, True)
+
+
+def parse_byte_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """
+    Один диапазон «bytes=start-end» -> (start, end) включительно.
+    None — заголовок не поддерживается (несколько диапазонов и т.п.): отдаётся весь ответ.
+    ValueError — диапазон за пределами данных (416).
+    """
+    match = _BYTE_RANGE.match(range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        # bytes=-N — последние N байт
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    first = int(start)
+    last = min(int(end), size - 1) if end else size - 1
+    if first >= size or first > last:
+        raise ValueError("Range not satisfiable")
+    return first, last
+
+
+def bytes_response(request: Request, data: bytes, media_type: str, headers: dict) -> Response:
+    """Ответ из байтов в памяти с поддержкой одного диапазона Range (и If-Range по ETag)."""
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == headers.get("ETag")):
+        try:
+            span = parse_byte_range(range_header, len(data))
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{len(data)}"})
+        if span is not None:
+            start, end = span
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            return Response(content=data[start : end + 1], status_code=206, media_type=media_type, headers=headers)
+    return Response(content=data, media_type=media_type, headers=headers)
@@ -0,0 +1,87 @@
+"""
+Сериализация ответов API: JSON через orjson и MessagePack по заголовку Accept.
+
+Ответы из строк БД собираются без pydantic: row_serializer(схема) строит dict по полям
+схемы прямо из атрибутов ORM-объекта (вычисляемые поля — свойствами схемы). Данные
+в БД уже проверены при записи, повторная валидация на каждом чтении — лишняя работа.
+Схема по-прежнему описывает ответ в OpenAPI (response_model у маршрута).
+"""
+
+from functools import lru_cache
+from typing import Any, Callable
+
+import msgpack
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Устаревшие и vendor-варианты, которые встречаются у клиентов
+_MSGPACK_MEDIA_TYPES = frozenset({MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"})
+_JSON_WILDCARDS = frozenset({"*/*", "application/*"})
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+@lru_cache(maxsize=128)
+def wants_msgpack(accept: str | None) -> bool:
+    """
+    Клиент предпочитает MessagePack: его q выше, чем у application/json, и не ниже,
+    чем у */* (явный тип важнее шаблона). Без Accept и при ошибке разбора — JSON.
+    """
+    if not accept:
+        return False
+    msgpack_q = json_q = wildcard_q = 0.0
+    for item in accept.split(","):
+        media, *params = (part.strip() for part in item.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    return False
+        media = media.lower()
+        if media in _MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media == "application/json":
+            json_q = max(json_q, q)
+        elif media in _JSON_WILDCARDS:
+            wildcard_q = max(wildcard_q, q)
+    return msgpack_q > 0 and msgpack_q > json_q and msgpack_q >= wildcard_q
+
+
+def negotiated_response(
+    request: Request, content: Any, status_code: int = 200, headers: dict | None = None
+) -> Response:
+    """JSON или MessagePack по Accept; Vary: Accept — чтобы кэши не смешивали форматы."""
+    headers = {**(headers or {}), "Vary": "Accept"}
+    if wants_msgpack(request.headers.get("accept")):
+        return MsgPackResponse(content, status_code=status_code, headers=headers)
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def row_serializer(schema: type[BaseModel]) -> Callable[[Any], dict]:
+    """
+    ORM-объект -> dict в форме ответа schema, без валидации. Поля читаются атрибутами
+    с теми же именами, вычисляемые поля (computed_field) считаются свойствами схемы
+    над самим ORM-объектом.
+    """
+    fields = tuple(schema.model_fields)
+    computed = tuple(
+        (name, info.wrapped_property.fget) for name, info in schema.model_computed_fields.items()
+    )
+
+    def serialize(obj: Any) -> dict:
+        data = {name: getattr(obj, name) for name in fields}
+        for name, getter in computed:
+            data[name] = getter(obj)
+        return data
+
+    return serialize
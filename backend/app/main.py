@@ -1,40 +1,66 @@
 """
 FastAPI backend: учёт занятий по английскому языку.
-Endpoints: / (frontend), /health, /api/*, /metrics.
+Endpoints: / (frontend), /livez, /readyz, /health, /api/*, /metrics.
 """
 
 import time
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
 
 import structlog
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import FileResponse, Response
-from starlette.requests import Request
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from app.config import get_settings
-from app.database import init_db
+from app.database import dispose_async_engine, init_db
 from app.logging_config import configure_logging
-from app.metrics import http_request_duration_seconds, http_requests_total
+from app.middleware import PrometheusMiddleware, RequestContextMiddleware
 from app.routers import health, lessons, report, students
+from app.services.converter import start_converter_pool, stop_converter_pool
+from app.services.readiness import start_readiness, stop_readiness
+from app.services.report_jobs import start_report_jobs, stop_report_jobs
 
 settings = get_settings()
 configure_logging(settings.log_level)
 log = structlog.get_logger()
 
 
+# Длительность этапов старта, сек (лог «Application started», benchmarks/bench_startup.py)
+startup_phases: dict[str, float] = {}
+
+
+@contextmanager
+def _startup_phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phases[name] = round(time.perf_counter() - start, 4)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup: инициализация БД. Shutdown: очистка при необходимости."""
+    """Startup: инициализация БД, пулов конвертеров и заданий PDF. Shutdown: их остановка."""
     log.info("Starting application", app_name=settings.app_name)
-    init_db()
-    log.info("Database initialized")
+    with _startup_phase("init_db"):
+        init_db()
+    with _startup_phase("converter_pool"):
+        start_converter_pool()
+    with _startup_phase("report_jobs"):
+        start_report_jobs()
+    with _startup_phase("readiness"):
+        start_readiness()
+    log.info("Application started", phases=startup_phases)
     yield
     log.info("Shutting down")
+    await stop_readiness()
+    stop_report_jobs()
+    stop_converter_pool()
+    await dispose_async_engine()
 
 
 app = FastAPI(
@@ -44,6 +70,8 @@ app = FastAPI(
     lifespan=lifespan,
     docs_url="/docs",
     redoc_url="/redoc",
+    # orjson вместо json.dumps для всех ответов с response_model
+    default_response_class=ORJSONResponse,
 )
 
 # CORS для frontend
@@ -53,28 +81,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing", "X-Next-Cursor", "X-Request-ID"],
 )
 
 
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    """Сбор HTTP-метрик для Prometheus."""
-
-    async def dispatch(self, request: Request, call_next):
-        method = request.method
-        path = request.scope.get("path", "")
-        # Ограничиваем кардинальность path: /api/lessons/1 -> /api/lessons/{id}
-        if path.startswith("/api/lessons") and path != "/api/lessons":
-            path = "/api/lessons/{id}"
-        start = time.perf_counter()
-        response = await call_next(request)
-        duration = time.perf_counter() - start
-        status = response.status_code
-        http_requests_total.labels(method=method, path=path, status_code=status).inc()
-        http_request_duration_seconds.labels(method=method, path=path).observe(duration)
-        return response
-
-
 app.add_middleware(PrometheusMiddleware)
+# Внешний слой: request id виден во всех логах запроса, включая метрики и CORS
+app.add_middleware(RequestContextMiddleware)
 
 # Роутеры
 app.include_router(health.router)
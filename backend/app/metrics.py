@@ -4,7 +4,9 @@ import time
 from contextlib import contextmanager
 from typing import Generator
 
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.config import get_settings
 
 # HTTP
 http_requests_total = Counter(
@@ -16,7 +18,7 @@ http_request_duration_seconds = Histogram(
     "http_request_duration_seconds",
     "HTTP request latency in seconds",
     ["method", "path"],
-    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    buckets=get_settings().http_duration_buckets,
 )
 
 # БД
@@ -32,6 +34,70 @@ db_errors_total = Counter(
     ["operation"],
 )
 
+# SQL-запросы по отпечаткам (app/db_instrumentation.py)
+db_statement_duration_seconds = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement duration in seconds by statement fingerprint",
+    ["fingerprint"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+db_statement_rows = Histogram(
+    "db_statement_rows",
+    "Rows returned or affected by SQL statement fingerprint",
+    ["fingerprint"],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000),
+)
+db_queries_per_request = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per HTTP request",
+    ["path"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+db_n_plus_one_total = Counter(
+    "db_n_plus_one_total",
+    "HTTP requests flagged for repeated identical statements (possible N+1)",
+    ["path"],
+)
+
+# Пул соединений (engine: sync / async / replica)
+db_pool_size = Gauge(
+    "db_pool_size",
+    "Configured connection pool size",
+    ["engine"],
+)
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out from the pool",
+    ["engine"],
+)
+db_pool_overflow = Gauge(
+    "db_pool_overflow",
+    "Overflow connections currently in use",
+    ["engine"],
+)
+db_pool_checkout_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+db_pool_invalidations_total = Counter(
+    "db_pool_invalidations_total",
+    "Pooled connections invalidated",
+    ["engine", "reason"],
+)
+
+# Чтение с реплики: куда направлена сессия и почему
+db_read_route_total = Counter(
+    "db_read_route_total",
+    "Read-only sessions by target database",
+    ["target", "reason"],
+)
+db_replica_up = Gauge(
+    "db_replica_up",
+    "Replica is used for reads (1) or bypassed after an error (0)",
+)
+
 # Бизнес
 lessons_saved_total = Counter(
     "lessons_saved_total",
@@ -42,6 +108,97 @@ reports_generated_total = Counter(
     "Total PDF reports generated",
 )
 
+# Пул конвертеров LibreOffice (docx -> pdf)
+report_converter_workers = Gauge(
+    "report_converter_workers",
+    "LibreOffice converter workers by state",
+    ["state"],
+)
+report_converter_queue_depth = Gauge(
+    "report_converter_queue_depth",
+    "Conversions waiting for a free converter worker",
+)
+report_converter_restarts_total = Counter(
+    "report_converter_restarts_total",
+    "Converter worker restarts",
+    ["reason"],
+)
+
+# Допуск к формированию отчётов (слоты, очередь, token bucket на клиента)
+report_admission_active = Gauge(
+    "report_admission_active",
+    "Reports being generated (admission slots in use)",
+)
+report_admission_queue_depth = Gauge(
+    "report_admission_queue_depth",
+    "Report generations waiting for an admission slot",
+)
+report_admission_queued_total = Counter(
+    "report_admission_queued_total",
+    "Report generations that had to wait for an admission slot",
+)
+report_admission_rejected_total = Counter(
+    "report_admission_rejected_total",
+    "Report requests rejected by admission control",
+    ["reason"],
+)
+report_admission_wait_seconds = Histogram(
+    "report_admission_wait_seconds",
+    "Time spent waiting for an admission slot in seconds",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+# Асинхронные задания на отчёты
+report_jobs_queue_depth = Gauge(
+    "report_jobs_queue_depth",
+    "Report jobs waiting for an executor",
+)
+report_jobs_total = Counter(
+    "report_jobs_total",
+    "Finished report jobs",
+    ["status"],
+)
+report_job_duration_seconds = Histogram(
+    "report_job_duration_seconds",
+    "Report job latency in seconds (wait in queue, run, total)",
+    ["phase"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+# Этапы формирования отчёта (запрос к БД, шаблон, подстановка, docx, конвертация, ...)
+report_stage_duration_seconds = Histogram(
+    "report_stage_duration_seconds",
+    "Report pipeline stage duration in seconds",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+# Кэш готовых PDF-отчётов
+report_pdf_cache_total = Counter(
+    "report_pdf_cache_total",
+    "Rendered PDF cache lookups",
+    ["tier", "result"],
+)
+
+# Кэш скомпилированного шаблона отчёта
+report_template_cache_total = Counter(
+    "report_template_cache_total",
+    "Report template cache lookups",
+    ["result"],
+)
+report_template_compile_seconds = Histogram(
+    "report_template_compile_seconds",
+    "Report template compile duration in seconds",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+# Кэш списка студентов (GET /api/students)
+student_list_cache_total = Counter(
+    "student_list_cache_total",
+    "Student list cache lookups",
+    ["result"],
+)
+
 
 @contextmanager
 def track_db_operation(operation: str) -> Generator[None, None, None]:
@@ -0,0 +1,138 @@
+"""
+ASGI middleware приложения (чистый ASGI, без BaseHTTPMiddleware).
+
+PrometheusMiddleware — HTTP-метрики Prometheus.
+
+Метка path — шаблон совпавшего маршрута (/api/students/{student_id}), а не сам URL:
+кардинальность не растёт с числом id. Запрос без маршрута — метка <unmatched>.
+Длительность считается до последнего байта тела ответа, поэтому потоковые ответы
+(ZIP, NDJSON) учитываются целиком и не буферизуются. Пути из metrics_exclude_paths
+(по умолчанию /metrics и /static) не учитываются.
+
+RequestContextMiddleware — request id (заголовок X-Request-ID, входящий или новый)
+в контексте structlog для всех логов запроса, и учёт SQL-запросов запроса:
+число запросов и признак N+1 (app/db_instrumentation.py).
+"""
+
+import re
+import time
+import uuid
+
+import structlog
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+from app.db_instrumentation import start_request_stats
+from app.metrics import (
+    db_n_plus_one_total,
+    db_queries_per_request,
+    http_request_duration_seconds,
+    http_requests_total,
+)
+
+log = structlog.get_logger()
+
+UNMATCHED_PATH = "<unmatched>"
+REQUEST_ID_HEADER = "X-Request-ID"
+# Входящий request id принимается, только если он короткий и без спецсимволов
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def route_label(scope: Scope) -> str:
+    """Шаблон пути совпавшего маршрута (метка метрик)."""
+    return getattr(scope.get("route"), "path", None) or UNMATCHED_PATH
+
+
+class PrometheusMiddleware:
+    """Сбор HTTP-метрик для Prometheus."""
+
+    def __init__(self, app: ASGIApp, exclude_paths: list[str] | None = None):
+        self.app = app
+        self.exclude_paths = tuple(
+            exclude_paths if exclude_paths is not None else get_settings().metrics_exclude_paths
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        finished = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, finished
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = True
+                self._observe(scope, status_code, time.perf_counter() - start)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Исключение или обрыв до конца тела — учитываем тем, что успели узнать
+            if not finished:
+                self._observe(scope, status_code, time.perf_counter() - start)
+
+    @staticmethod
+    def _observe(scope: Scope, status_code: int, duration: float) -> None:
+        path = route_label(scope)
+        method = scope["method"]
+        http_requests_total.labels(method=method, path=path, status_code=status_code).inc()
+        http_request_duration_seconds.labels(method=method, path=path).observe(duration)
+
+
+class RequestContextMiddleware:
+    """Request id в логах и ответе; число SQL-запросов на HTTP-запрос и признак N+1."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == b"x-request-id"),
+            "",
+        )
+        request_id = incoming if _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+        structlog.contextvars.clear_contextvars()
+        structlog.contextvars.bind_contextvars(request_id=request_id)
+        stats = start_request_stats()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._report(scope, stats)
+            structlog.contextvars.clear_contextvars()
+
+    @staticmethod
+    def _report(scope: Scope, stats) -> None:
+        if scope["path"].startswith(tuple(get_settings().metrics_exclude_paths)):
+            return
+        path = route_label(scope)
+        db_queries_per_request.labels(path=path).observe(stats.count)
+        if not stats.by_fingerprint:
+            return
+        fingerprint, repeats = stats.by_fingerprint.most_common(1)[0]
+        if repeats >= get_settings().n_plus_one_threshold:
+            db_n_plus_one_total.labels(path=path).inc()
+            log.warning(
+                "Possible N+1 query pattern",
+                path=path,
+                queries=stats.count,
+                repeats=repeats,
+                fingerprint=fingerprint,
+                db_ms=round(stats.duration * 1000, 2),
+            )
@@ -1,6 +1,8 @@
 """SQLAlchemy models."""
 
 from app.models.lesson import LessonRecord
+from app.models.schema_version import SchemaVersion
 from app.models.student import Student
+from app.models.summary import StudentYearSummary
 
-__all__ = ["Student", "LessonRecord"]
+__all__ = ["Student", "LessonRecord", "StudentYearSummary", "SchemaVersion"]
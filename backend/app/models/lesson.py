@@ -1,6 +1,6 @@
 """Lesson record model — данные по занятиям за месяц/год."""
 
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -13,6 +13,12 @@ class LessonRecord(Base):
     """
 
     __tablename__ = "lesson_records"
+    __table_args__ = (
+        # Одна запись на студента и месяц; по этому индексу работают поиск и upsert
+        Index("uq_lesson_records_student_year_month", "student_id", "year", "month", unique=True),
+        # Сетка за год (GET /api/lessons/grid): фильтр по году и порядок (студент, месяц)
+        Index("ix_lesson_records_year_student_month", "year", "student_id", "month"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
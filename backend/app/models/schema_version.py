@@ -0,0 +1,18 @@
+"""Версия схемы БД — позволяет не выполнять create_all и наполнение при каждом старте."""
+
+from sqlalchemy import Column, DateTime, Integer, func
+
+from app.database import Base
+
+
+class SchemaVersion(Base):
+    """Одна строка (id = 1): версия схемы, до которой БД уже доведена."""
+
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self) -> str:
+        return f"<SchemaVersion(version={self.version})>"
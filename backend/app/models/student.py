@@ -1,6 +1,6 @@
 """Student model — данные студентов для выпадающего списка."""
 
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -10,6 +10,14 @@ class Student(Base):
     """Студент: имя и фамилия на русском и на иврите."""
 
     __tablename__ = "students"
+    __table_args__ = (
+        # Порядок списка и keyset-пагинация; префиксный поиск по фамилии
+        Index("ix_students_last_first_id", "last_name", "first_name", "id"),
+        # Префиксный поиск по остальным колонкам имени
+        Index("ix_students_first_name", "first_name"),
+        Index("ix_students_first_name_he", "first_name_he"),
+        Index("ix_students_last_name_he", "last_name_he"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     # Русский
@@ -0,0 +1,26 @@
+"""Сводка занятий студента за год — поддерживается при каждом сохранении занятий."""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, func
+
+from app.database import Base
+
+
+class StudentYearSummary(Base):
+    """
+    Итоги по студенту за год: сумма часов, число месяцев с записями, последний месяц.
+    Пересчитывается из lesson_records в той же транзакции, что и upsert занятия
+    (app/services/summary.py), поэтому читается одной строкой без агрегации.
+    """
+
+    __tablename__ = "student_year_summaries"
+
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+
+    hours_total = Column(Integer, nullable=False, default=0)
+    months_recorded = Column(Integer, nullable=False, default=0)
+    last_month = Column(Integer, nullable=False)  # 1–12
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self) -> str:
+        return f"<StudentYearSummary(student_id={self.student_id}, year={self.year}, hours={self.hours_total})>"
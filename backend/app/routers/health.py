@@ -1,22 +1,45 @@
-"""Health check endpoint для Kubernetes и мониторинга."""
+"""
+Health check endpoints для Kubernetes и мониторинга.
+
+/livez — процесс жив (без I/O); /readyz — результат фоновой проверки БД и конвейера
+отчётов (app/services/readiness.py); /health — прямая проверка БД для ручной диагностики.
+"""
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.deps import get_db
+from app.services.readiness import get_readiness
 
 router = APIRouter(tags=["health"])
 
 
+@router.get("/livez", summary="Liveness probe")
+async def livez():
+    """Процесс отвечает (event loop не заблокирован). Без обращений к БД и диску."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz", summary="Readiness probe")
+async def readyz():
+    """
+    Готовность принимать трафик: БД доступна, отчёты формируются.
+    Отдаётся последний результат фоновой проверки; 503 — не готов.
+    """
+    ready, body = get_readiness()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
 @router.get("/health", summary="Health check")
-def health(db: Session = Depends(get_db)):
+async def health(db: AsyncSession = Depends(get_db)):
     """
-    Проверка работоспособности сервиса и доступности БД.
-    Используется Kubernetes liveness/readiness и мониторингом.
+    Проверка работоспособности сервиса и доступности БД (запрос к БД на каждый вызов).
+    Для ручной диагностики и мониторинга; пробы Kubernetes — /livez и /readyz.
     """
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         db_status = "ok"
     except Exception:
         db_status = "error"
@@ -1,80 +1,145 @@
 """API занятий — сохранение и чтение данных по занятиям."""
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import Receive, Scope, Send
 
-from app.deps import get_db
+from app.config import get_settings
+from app.database import get_async_session_factory
+from app.db_routing import ReplicaFallbackRoute, remember_write
+from app.deps import get_db, get_read_db
+from app.http_serialization import negotiated_response, row_serializer
 from app.metrics import lessons_saved_total, track_db_operation
-from app.models import LessonRecord, Student
-from app.schemas import LessonRecordCreate, LessonRecordResponse
+from app.models import LessonRecord
+from app.schemas import LessonGridResponse, LessonRecordCreate, LessonRecordResponse
+from app.services import lesson_import
+from app.services.lesson_grid import get_lesson_grid
+from app.services.lessons import upsert_lesson_record
+from app.services.pdf_cache import get_pdf_cache
 
-router = APIRouter(prefix="/api/lessons", tags=["lessons"])
+router = APIRouter(prefix="/api/lessons", tags=["lessons"], route_class=ReplicaFallbackRoute)
+
+_lesson_row = row_serializer(LessonRecordResponse)
 
 
 @router.post("", response_model=LessonRecordResponse, status_code=201)
-def send_lesson_data(data: LessonRecordCreate, db: Session = Depends(get_db)):
+async def send_lesson_data(data: LessonRecordCreate, response: Response, db: AsyncSession = Depends(get_db)):
     """
     Отправка данных занятия (Send data).
-    Создаёт или обновляет запись по студенту, году и месяцу.
+    Создаёт или обновляет запись по студенту, году и месяцу — одним запросом (upsert).
     """
     with track_db_operation("lesson_save"):
-        student = db.query(Student).filter(Student.id == data.student_id).first()
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
-
-        existing = (
-            db.query(LessonRecord)
-            .filter(
-                LessonRecord.student_id == data.student_id,
-                LessonRecord.year == data.year,
-                LessonRecord.month == data.month,
-            )
-            .first()
-        )
+        record_id = await db.run_sync(upsert_lesson_record, data)
+        if record_id is not None:
+            await db.commit()
+    if record_id is None:
+        raise HTTPException(status_code=404, detail="Student not found")
 
-        if existing:
-            existing.grammar_e = data.grammar_e
-            existing.reading_e = data.reading_e
-            existing.speaking_e = data.speaking_e
-            existing.writing_e = data.writing_e
-            existing.hours_studied = data.hours_studied
-            db.commit()
-            db.refresh(existing)
-            lessons_saved_total.inc()
-            return existing
-
-        record = LessonRecord(
-            student_id=data.student_id,
-            year=data.year,
-            month=data.month,
-            grammar_e=data.grammar_e,
-            reading_e=data.reading_e,
-            speaking_e=data.speaking_e,
-            writing_e=data.writing_e,
-            hours_studied=data.hours_studied,
-        )
-        db.add(record)
-        db.commit()
-        db.refresh(record)
-        lessons_saved_total.inc()
-        return record
+    get_pdf_cache().invalidate(data.student_id, data.year, data.month)
+    lessons_saved_total.inc()
+    remember_write(response)
+    return LessonRecordResponse(id=record_id, **data.model_dump())
 
 
-@router.get("", response_model=LessonRecordResponse | None)
-def get_lesson_for_month(
-    student_id: int = Query(...),
-    year: int = Query(...),
-    month: int = Query(..., ge=1, le=12),
-    db: Session = Depends(get_db),
-):
-    """Получить данные занятия по студенту, году и месяцу (для заполнения формы)."""
+class _UploadStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse, генератор которого сам читает тело запроса: receive не слушается
+    параллельно (иначе ожидание обрыва соединения забирало бы части тела). Обрыв
+    соединения прерывает чтение тела в генераторе (ClientDisconnect).
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@router.post("/bulk", response_class=StreamingResponse)
+async def import_lessons(request: Request):
+    """
+    Массовый импорт занятий: тело — NDJSON (application/x-ndjson) или CSV (text/csv)
+    с полями LessonRecordCreate. Строки проверяются по мере чтения и сохраняются
+    пачками (upsert). Ответ — NDJSON, отдаётся по мере сохранения пачек: результат
+    по каждой строке (в порядке строк загрузки, поле line — номер строки) и итоговая
+    строка summary.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type in lesson_import.NDJSON_MEDIA_TYPES:
+        rows = lesson_import.iter_ndjson_rows(request.stream())
+    elif media_type in lesson_import.CSV_MEDIA_TYPES:
+        rows = lesson_import.iter_csv_rows(request.stream())
+    else:
+        raise HTTPException(status_code=415, detail="Expected application/x-ndjson or text/csv body")
+
+    batch_size = max(get_settings().lesson_bulk_batch_size, 1)
+
+    async def iter_results():
+        # Сессия на время потока: зависимости с yield закрываются до отправки тела ответа
+        async with get_async_session_factory()() as db:
+            total = saved = 0
+            batch = []
+            async for row in rows:
+                total += 1
+                # Ошибочные строки тоже идут в пачку — результаты в порядке загрузки
+                batch.append((row.line, lesson_import.validate_row(row)))
+                if len(batch) >= batch_size:
+                    batch_saved, results = await db.run_sync(lesson_import.save_batch, batch)
+                    saved += batch_saved
+                    batch = []
+                    yield results
+            if batch:
+                batch_saved, results = await db.run_sync(lesson_import.save_batch, batch)
+                saved += batch_saved
+                yield results
+        yield lesson_import.summary_line(total, saved)
+
+    response = _UploadStreamingResponse(iter_results(), media_type="application/x-ndjson")
+    remember_write(response)
+    return response
+
+
+async def find_lesson_record(db: AsyncSession, student_id: int, year: int, month: int) -> LessonRecord | None:
+    """Запись занятия по студенту, году и месяцу (None — данных ещё нет)."""
     with track_db_operation("lesson_get"):
-        return (
-            db.query(LessonRecord)
-            .filter(
+        return await db.scalar(
+            select(LessonRecord).where(
                 LessonRecord.student_id == student_id,
                 LessonRecord.year == year,
                 LessonRecord.month == month,
             )
-            .first()
         )
+
+
+@router.get("", response_model=LessonRecordResponse | None)
+async def get_lesson_for_month(
+    request: Request,
+    student_id: int = Query(...),
+    year: int = Query(...),
+    month: int = Query(..., ge=1, le=12),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Получить данные занятия по студенту, году и месяцу (для заполнения формы).
+    JSON или MessagePack по Accept; нет записи — null.
+    """
+    record = await find_lesson_record(db, student_id, year, month)
+    return negotiated_response(request, _lesson_row(record) if record is not None else None)
+
+
+@router.get("/grid", response_model=LessonGridResponse)
+async def get_lesson_grid_for_year(
+    request: Request,
+    year: int = Query(...),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Все записи занятий за год одним запросом — для обзорной таблицы студенты × месяцы.
+    Ответ колоночный: параллельные массивы student_id, month, hours_studied и текстовых полей.
+    JSON или MessagePack по Accept.
+    """
+    with track_db_operation("lesson_grid"):
+        grid = await db.run_sync(get_lesson_grid, year)
+    # Данные уже в форме ответа — без повторной проверки схемой
+    return negotiated_response(request, grid)
@@ -1,38 +1,55 @@
 """API формирования PDF-отчёта (Print report)."""
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import Response
-from sqlalchemy.orm import Session, joinedload
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
 
-from app.deps import get_db
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from starlette.concurrency import run_in_threadpool
+
+from app.db_routing import ReplicaFallbackRoute
+from app.deps import get_read_db
+from app.http_cache import etag_matches
+from app.http_files import TempDirFileResponse, bytes_response
 from app.metrics import reports_generated_total
 from app.models import LessonRecord
-from app.services.report import render_docx_and_convert_to_pdf
+from app.schemas import ReportJobCreate, ReportJobResponse
+from app.services.admission import AdmissionRejected, client_key, get_report_admission
+from app.services.converter import ConverterPoolBusy
+from app.services.pdf_cache import get_pdf_cache
+from app.services.renderers import ReportRenderer, get_renderer
+from app.services.report import get_report_context, new_report_dir
+from app.services.report_batch import build_batch_items, iter_reports_zip
+from app.services.report_jobs import JobStatus, ReportJob, ReportJobQueueFull, get_report_jobs
+from app.services.report_timing import report_stage, start_report_timer
 
-router = APIRouter(prefix="/api/report", tags=["report"])
+log = structlog.get_logger()
 
+router = APIRouter(prefix="/api/report", tags=["report"], route_class=ReplicaFallbackRoute)
 
-@router.get("/pdf", response_class=Response)
-def print_report(
-    student_id: int = Query(..., description="ID студента"),
-    year: int = Query(..., description="Год"),
-    month: int = Query(..., ge=1, le=12, description="Месяц (1–12)"),
-    db: Session = Depends(get_db),
-):
-    """
-    Формирует PDF-отчёт по выбранному студенту, месяцу и году.
-    Используется шаблон .docx с подстановкой данных из БД.
-    Файл возвращается для скачивания.
-    """
-    record = (
-        db.query(LessonRecord)
+
+def _resolve_renderer(engine: str | None) -> ReportRenderer:
+    try:
+        return get_renderer(engine)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def _get_record(db: AsyncSession, student_id: int, year: int, month: int) -> LessonRecord:
+    """Запись занятия со студентом (одним запросом) или 404."""
+    record = await db.scalar(
+        select(LessonRecord)
         .options(joinedload(LessonRecord.student))
-        .filter(
+        .where(
             LessonRecord.student_id == student_id,
             LessonRecord.year == year,
             LessonRecord.month == month,
         )
-        .first()
     )
 
     if not record:
@@ -40,23 +57,239 @@ def print_report(
             status_code=404,
             detail="No lesson data found for this student, year and month",
         )
+    return record
 
+
+@router.get("/pdf", response_class=FileResponse)
+@router.head("/pdf", include_in_schema=False)
+async def print_report(
+    request: Request,
+    student_id: int = Query(..., description="ID студента"),
+    year: int = Query(..., description="Год"),
+    month: int = Query(..., ge=1, le=12, description="Месяц (1–12)"),
+    engine: str | None = Query(None, description="Движок PDF: libreoffice или native"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Формирует PDF-отчёт по выбранному студенту, месяцу и году.
+    Используется шаблон .docx с подстановкой данных из БД (или встроенный движок native).
+    Файл возвращается для скачивания — потоком с диска (HEAD и Range поддерживаются),
+    временный каталог удаляется после ответа. Готовые PDF кэшируются; ответ несёт ETag,
+    на совпадающий If-None-Match возвращается 304. Время этапов — в заголовке
+    Server-Timing, метрике report_stage_duration_seconds и строке лога «Report timings».
+    Формирование проходит допуск (app/services/admission.py): сверх лимита клиента — 429,
+    при переполненной очереди или долгом ожидании слота — 503; оба с Retry-After.
+    """
+    timer = start_report_timer()
+    renderer = _resolve_renderer(engine)
+    with report_stage("db"):
+        record = await _get_record(db, student_id, year, month)
+    context = get_report_context(record)
+    # Соединение возвращается в пул до ожидания слота и конвертации — долгие отчёты
+    # не держат соединения, нужные обычным запросам
+    await db.close()
     try:
-        pdf_bytes = render_docx_and_convert_to_pdf(record)
+        # Первый вызов компилирует шаблон (чтение файла) — вне event loop
+        with report_stage("cache_key"):
+            cache_key = await run_in_threadpool(renderer.cache_key, context)
     except FileNotFoundError as e:
         raise HTTPException(status_code=503, detail=f"Report template missing: {e}")
-    except RuntimeError as e:
-        raise HTTPException(status_code=500, detail=f"Report generation failed: {e}")
-    except Exception as e:
-        err_msg = str(e).replace("\n", " ").strip() or type(e).__name__
-        raise HTTPException(status_code=500, detail=f"Report error: {err_msg}")
 
-    reports_generated_total.inc()
+    etag = f'"{cache_key}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        headers["Server-Timing"] = timer.server_timing()
+        return Response(status_code=304, headers=headers)
+
+    cache = get_pdf_cache()
+    with report_stage("cache_lookup"):
+        # Попадание на диск — ссылка на файл кэша в своём временном каталоге: вытеснение
+        # не удалит файл до конца ответа
+        cached = await run_in_threadpool(cache.lookup, cache_key, new_report_dir)
+    report_dir = pdf_path = None
+    rendered = cached is None
+    if cached is None:
+        try:
+            # Токен тратится здесь, а не до проверки кэша и записи; отказ очереди его возвращает
+            async with get_report_admission().slot(client_key(request)):
+                report_dir = await run_in_threadpool(new_report_dir)
+                pdf_path = await run_in_threadpool(renderer.render_to_file, context, report_dir)
+                with report_stage("cache_store"):
+                    await run_in_threadpool(cache.put_file, cache_key, (student_id, year, month), pdf_path)
+        except BaseException as e:
+            if report_dir is not None:
+                await run_in_threadpool(shutil.rmtree, report_dir, True)
+            raise _render_error(e)
+        reports_generated_total.inc()
+    elif isinstance(cached, Path):
+        pdf_path = cached
+        report_dir = cached.parent
 
     # Имя файла только ASCII — заголовки HTTP кодируются в latin-1
-    filename = f"report_{record.student_id}_{year}_{month:02d}.pdf"
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
+    filename = f"report_{student_id}_{year}_{month:02d}.pdf"
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    headers["Server-Timing"] = timer.server_timing()
+    log.info(
+        "Report timings",
+        student_id=student_id,
+        year=year,
+        month=month,
+        engine=renderer.name,
+        cached=not rendered,
+        pdf_bytes=len(cached) if isinstance(cached, bytes) else pdf_path.stat().st_size,
+        **timer.as_log(),
+    )
+    if isinstance(cached, bytes):
+        return bytes_response(request, cached, "application/pdf", headers)
+    return TempDirFileResponse(pdf_path, report_dir, media_type="application/pdf", headers=headers)
+
+
+def _render_error(e: BaseException) -> BaseException:
+    """Ошибка формирования PDF -> HTTPException (отмена запроса и т.п. — как есть)."""
+    if not isinstance(e, Exception):
+        return e
+    if isinstance(e, AdmissionRejected):
+        return HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    if isinstance(e, FileNotFoundError):
+        return HTTPException(status_code=503, detail=f"Report template missing: {e}")
+    if isinstance(e, ConverterPoolBusy):
+        return HTTPException(
+            status_code=503,
+            detail=f"Report converter busy: {e}",
+            headers={"Retry-After": "5"},
+        )
+    if isinstance(e, RuntimeError):
+        return HTTPException(status_code=500, detail=f"Report generation failed: {e}")
+    err_msg = str(e).replace("\n", " ").strip() or type(e).__name__
+    return HTTPException(status_code=500, detail=f"Report error: {err_msg}")
+
+
+@router.get("/batch", response_class=StreamingResponse)
+async def print_month_reports(
+    request: Request,
+    year: int = Query(..., description="Год"),
+    month: int = Query(..., ge=1, le=12, description="Месяц (1–12)"),
+    engine: str | None = Query(None, description="Движок PDF: libreoffice или native"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    ZIP-архив с PDF-отчётами всех студентов за месяц.
+    Записи загружаются одним запросом, архив отдаётся потоком по мере конвертации.
+    Отчёты, которые не удалось сконвертировать, перечислены в errors.txt внутри архива.
+    Запрос тратит один токен клиента (429 сверх лимита); пачки конвертируются в общих слотах допуска,
+    при переполненной очереди допуска — 503 до начала архива.
+    """
+    records = (
+        await db.scalars(
+            select(LessonRecord)
+            .options(joinedload(LessonRecord.student))
+            .where(LessonRecord.year == year, LessonRecord.month == month)
+            .order_by(LessonRecord.student_id)
+        )
+    ).all()
+    await db.close()  # архив формируется долго — соединение в пул сразу после чтения
+    renderer = _resolve_renderer(engine)
+    if not records:
+        raise HTTPException(status_code=404, detail="No lesson data found for this year and month")
+    admission = get_report_admission()
+    client = client_key(request)
+    try:
+        admission.check_rate(client)
+        try:
+            # Очередь допуска полна — 503 сразу, а не ошибки в каждом отчёте архива
+            admission.check_capacity()
+        except AdmissionRejected:
+            admission.refund_rate(client)
+            raise
+    except AdmissionRejected as e:
+        raise _render_error(e)
+
+    try:
+        items = await run_in_threadpool(build_batch_items, records, renderer)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=f"Report template missing: {e}")
+
+    filename = f"reports_{year}_{month:02d}.zip"
+    return StreamingResponse(
+        iter_reports_zip(items, renderer),
+        media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+def _job_response(job: ReportJob) -> ReportJobResponse:
+    def ts(value: float | None) -> datetime | None:
+        return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+    return ReportJobResponse(
+        id=job.id,
+        status=job.status.value,
+        student_id=job.student_id,
+        year=job.year,
+        month=job.month,
+        created_at=ts(job.created_at),
+        started_at=ts(job.started_at),
+        finished_at=ts(job.finished_at),
+        error=job.error,
+        download_url=f"{router.prefix}/jobs/{job.id}/pdf" if job.status == JobStatus.done else None,
+    )
+
+
+def _get_job(job_id: str) -> ReportJob:
+    jobs = get_report_jobs()
+    job = jobs.get(job_id) if jobs is not None else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job
+
+
+@router.post("/jobs", response_model=ReportJobResponse, status_code=202)
+async def create_report_job(
+    request: Request, data: ReportJobCreate, db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Поставить формирование PDF-отчёта в очередь.
+    Данные читаются из БД здесь же; сессия освобождается до начала конвертации.
+    Задание тратит токен клиента (429 сверх лимита; 404 и переполненная очередь заданий —
+    без траты) и формируется в общих слотах допуска: не дождалось слота — задание failed.
+    """
+    jobs = get_report_jobs()
+    if jobs is None:
+        raise HTTPException(status_code=503, detail="Report jobs are not available")
+    renderer = _resolve_renderer(data.engine)
+    record = await _get_record(db, data.student_id, data.year, data.month)
+    context = get_report_context(record)
+    await db.close()
+    admission = get_report_admission()
+    client = client_key(request)
+    try:
+        admission.check_rate(client)
+    except AdmissionRejected as e:
+        raise _render_error(e)
+    try:
+        job = jobs.submit(data.student_id, data.year, data.month, context, renderer)
+    except ReportJobQueueFull as e:
+        admission.refund_rate(client)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(job_id: str):
+    """Статус задания: queued / running / done / failed."""
+    return _job_response(_get_job(job_id))
+
+
+@router.get("/jobs/{job_id}/pdf", response_class=FileResponse)
+@router.head("/jobs/{job_id}/pdf", include_in_schema=False)
+async def download_report_job(job_id: str):
+    """Скачать готовый PDF задания (409, пока задание не завершено успешно)."""
+    job = _get_job(job_id)
+    if job.status != JobStatus.done or job.pdf_path is None:
+        raise HTTPException(status_code=409, detail=f"Report job is {job.status.value}")
+    filename = f"report_{job.student_id}_{job.year}_{job.month:02d}.pdf"
+    return FileResponse(job.pdf_path, media_type="application/pdf", filename=filename)
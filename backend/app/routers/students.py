@@ -1,23 +1,73 @@
 """API студентов — для выпадающего списка на frontend."""
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps import get_db
+from app.config import get_settings
+from app.database import get_async_session_factory
+from app.db_routing import ReplicaFallbackRoute, remember_write
+from app.deps import get_db, get_read_db
+from app.http_cache import etag_matches
+from app.http_serialization import MsgPackResponse, negotiated_response, row_serializer, wants_msgpack
 from app.models import Student
-from app.schemas import StudentCreate, StudentResponse
+from app.schemas import StudentCreate, StudentResponse, StudentYearSummaryResponse
+from app.services.student_cache import cached_student_list, get_student_list, invalidate_student_list
+from app.services.students import list_students_page
+from app.services.summary import get_year_summaries
 
-router = APIRouter(prefix="/api/students", tags=["students"])
+router = APIRouter(prefix="/api/students", tags=["students"], route_class=ReplicaFallbackRoute)
+
+_student_row = row_serializer(StudentResponse)
 
 
 @router.get("", response_model=list[StudentResponse])
-def list_students(db: Session = Depends(get_db)):
-    """Список студентов (имя и фамилия) для выпадающего списка."""
-    return db.query(Student).order_by(Student.last_name, Student.first_name).all()
+async def list_students(
+    request: Request,
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = Query(None),
+    q: str | None = Query(None, min_length=1, max_length=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Список студентов (имя и фамилия) для выпадающего списка.
+
+    Без параметров — весь список (не больше student_list_max_rows строк, продолжение —
+    по X-Next-Cursor): готовое тело кэшируется в памяти (заполняется с основной БД);
+    ответ несёт ETag, на совпадающий If-None-Match — 304. С limit, cursor или q — страница по
+    (фамилия, имя, id) и поиск по началу имени/фамилии (рус./иврит); курсор следующей
+    страницы — в заголовке X-Next-Cursor (нет заголовка — страница последняя).
+    С Accept: application/msgpack ответ — в MessagePack, иначе JSON.
+    """
+    if limit is not None or cursor is not None or q is not None:
+        max_limit = get_settings().student_page_max_limit
+        try:
+            students, next_cursor = await db.run_sync(
+                list_students_page, min(limit or max_limit, max_limit), cursor, q
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else None
+        return negotiated_response(request, [_student_row(s) for s in students], headers=headers)
+
+    cached = cached_student_list()
+    if cached is None:
+        # Кэш общий для всех клиентов — заполняем с основной БД, не с отстающей реплики
+        async with get_async_session_factory()() as primary:
+            cached = await primary.run_sync(get_student_list)
+    as_msgpack = wants_msgpack(request.headers.get("accept"))
+    body, etag = cached.representation(as_msgpack)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if cached.next_cursor is not None:
+        headers["X-Next-Cursor"] = cached.next_cursor
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    media_type = MsgPackResponse.media_type if as_msgpack else "application/json"
+    return Response(content=body, media_type=media_type, headers=headers)
 
 
 @router.post("", response_model=StudentResponse, status_code=201)
-def create_student(student: StudentCreate, db: Session = Depends(get_db)):
+async def create_student(student: StudentCreate, response: Response, db: AsyncSession = Depends(get_db)):
     """Создание студента (для администрирования/начального наполнения)."""
     obj = Student(
         first_name=student.first_name,
@@ -26,15 +76,29 @@ def create_student(student: StudentCreate, db: Session = Depends(get_db)):
         last_name_he=student.last_name_he or "",
     )
     db.add(obj)
-    db.commit()
-    db.refresh(obj)
+    await db.commit()
+    invalidate_student_list()
+    remember_write(response)
     return obj
 
 
 @router.get("/{student_id}", response_model=StudentResponse)
-def get_student(student_id: int, db: Session = Depends(get_db)):
-    """Получить студента по ID."""
-    student = db.query(Student).filter(Student.id == student_id).first()
+async def get_student(request: Request, student_id: int, db: AsyncSession = Depends(get_read_db)):
+    """Получить студента по ID (JSON или MessagePack по Accept)."""
+    student = await db.get(Student, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
-    return student
+    return negotiated_response(request, _student_row(student))
+
+
+@router.get("/{student_id}/summary", response_model=list[StudentYearSummaryResponse])
+async def get_student_summary(
+    student_id: int,
+    year: int | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Годовые итоги студента (часы, число месяцев, последний месяц); year — только за этот год."""
+    summaries = await db.run_sync(get_year_summaries, student_id, year)
+    if not summaries and await db.get(Student, student_id) is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return summaries
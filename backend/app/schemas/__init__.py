@@ -1,11 +1,17 @@
 """Pydantic schemas for API."""
 
-from app.schemas.lesson import LessonRecordCreate, LessonRecordResponse
+from app.schemas.lesson import LessonGridResponse, LessonRecordCreate, LessonRecordResponse
+from app.schemas.report import ReportJobCreate, ReportJobResponse
 from app.schemas.student import StudentCreate, StudentResponse
+from app.schemas.summary import StudentYearSummaryResponse
 
 __all__ = [
     "StudentCreate",
     "StudentResponse",
     "LessonRecordCreate",
     "LessonRecordResponse",
+    "LessonGridResponse",
+    "ReportJobCreate",
+    "ReportJobResponse",
+    "StudentYearSummaryResponse",
 ]
@@ -22,3 +22,17 @@ class LessonRecordResponse(LessonRecordBase):
     id: int
 
     model_config = {"from_attributes": True}
+
+
+class LessonGridResponse(BaseModel):
+    """Все записи за год колонками: i-й элемент каждого массива — i-я запись."""
+
+    year: int
+    count: int
+    student_id: list[int]
+    month: list[int]
+    hours_studied: list[int]
+    grammar_e: list[str]
+    reading_e: list[str]
+    speaking_e: list[str]
+    writing_e: list[str]
@@ -0,0 +1,25 @@
+"""Pydantic schemas for report jobs."""
+
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class ReportJobCreate(BaseModel):
+    student_id: int
+    year: int
+    month: int = Field(..., ge=1, le=12)
+    engine: str | None = None  # libreoffice / native; по умолчанию — из настроек
+
+
+class ReportJobResponse(BaseModel):
+    id: str
+    status: str  # queued / running / done / failed
+    student_id: int
+    year: int
+    month: int
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+    download_url: str | None = None
@@ -0,0 +1,16 @@
+"""Pydantic schemas for StudentYearSummary."""
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class StudentYearSummaryResponse(BaseModel):
+    student_id: int
+    year: int
+    hours_total: int
+    months_recorded: int
+    last_month: int
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
@@ -0,0 +1,320 @@
+"""
+Допуск к формированию PDF-отчётов (admission control).
+
+Глобальный предел: не больше report_max_concurrency отчётов формируется одновременно
+во всём процессе — HTTP-запросы, задания (report_jobs) и пакетная выгрузка делят одни
+слоты, поэтому одновременных LibreOffice (или native-рендеров) не больше предела,
+даже когда пул конвертеров выключен. Освободившийся слот передаётся первому в очереди.
+
+Ожидающие слота — HTTP-запросы, задания и пакетная выгрузка — стоят в одной
+ограниченной очереди (report_queue_depth) не дольше report_queue_timeout секунд,
+иначе — AdmissionRejected: HTTP-запрос получает 503 с Retry-After, задание
+завершается с ошибкой, отчёт пакета попадает в errors.txt архива.
+
+Token bucket на клиента: report_rate_per_minute отчётов в минуту с запасом
+report_rate_burst; сверх — AdmissionRejected с reason=rate_limited (429).
+Учитывается только формирование: ответы из кэша и 304 токены не тратят,
+токен отказа по очереди возвращается клиенту (refund_rate).
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+from fastapi import Request
+
+from app.config import get_settings
+from app.metrics import (
+    report_admission_active,
+    report_admission_queue_depth,
+    report_admission_queued_total,
+    report_admission_rejected_total,
+    report_admission_wait_seconds,
+)
+from app.services.report_timing import report_stage
+
+# Сколько клиентов помнит token bucket; самые давние вытесняются (и получают полный запас)
+MAX_TRACKED_CLIENTS = 10_000
+# Пределы подсказки Retry-After, сек
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+
+class AdmissionRejected(RuntimeError):
+    """Отказ в допуске: reason — rate_limited (429), queue_full или queue_timeout (503)."""
+
+    def __init__(self, reason: str, retry_after: int, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def status_code(self) -> int:
+        return 429 if self.reason == "rate_limited" else 503
+
+
+class _Waiter:
+    """Ожидающий слота: корутина (future в своём event loop) или поток (Event)."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None):
+        self.granted = False
+        self._loop = loop
+        self._future = loop.create_future() if loop is not None else None
+        self._event = threading.Event() if loop is None else None
+
+    def wake(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._resolve)
+        else:
+            self._event.set()
+
+    def _resolve(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+    async def wait_async(self, timeout: float) -> None:
+        await asyncio.wait_for(asyncio.shield(self._future), timeout)
+
+    def wait_blocking(self, timeout: float) -> bool:
+        """False — таймаут (слот мог быть передан в тот же момент: смотреть granted)."""
+        return self._event.wait(timeout)
+
+
+class TokenBucket:
+    """Token bucket на ключ клиента: rate токенов в секунду, не больше burst."""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = MAX_TRACKED_CLIENTS):
+        self._rate = rate
+        self._burst = max(burst, 1)
+        self._max_clients = max_clients
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()  # ключ -> (токены, время)
+        self._lock = threading.Lock()
+
+    def take(self, key: str) -> float:
+        """Взять токен: 0 — взят, иначе сколько секунд до следующего токена."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self._burst, now))
+            tokens = min(self._burst, tokens + (now - updated) * self._rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self._rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self._max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def refund(self, key: str) -> None:
+        """Вернуть взятый токен (запрос отклонён до формирования)."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                self._buckets[key] = (min(self._burst, bucket[0] + 1), bucket[1])
+
+
+class ReportAdmission:
+    """Слоты формирования отчётов, очередь ожидания и token bucket на клиента."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        queue_depth: int,
+        queue_timeout: float,
+        rate_per_minute: float,
+        burst: int,
+    ):
+        self._limit = max_concurrency  # <= 0 — без предела
+        self._queue_depth = queue_depth
+        self._queue_timeout = queue_timeout
+        self._bucket = TokenBucket(rate_per_minute / 60, burst) if rate_per_minute > 0 else None
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: deque[_Waiter] = deque()
+        # Скользящее среднее времени занятия слота — для подсказки Retry-After
+        self._avg_hold = 1.0
+
+    def check_rate(self, client: str) -> None:
+        """Потратить токен клиента; AdmissionRejected(rate_limited), если их нет."""
+        if self._bucket is None:
+            return
+        wait = self._bucket.take(client)
+        if wait > 0:
+            report_admission_rejected_total.labels(reason="rate_limited").inc()
+            raise AdmissionRejected("rate_limited", _clamp_retry(wait), "Too many report requests")
+
+    def refund_rate(self, client: str) -> None:
+        """Вернуть токен клиента, если формирование отклонено после check_rate."""
+        if self._bucket is not None:
+            self._bucket.refund(client)
+
+    def check_capacity(self) -> None:
+        """AdmissionRejected(queue_full), если очередь ожидания уже полна (проверка без занятия слота)."""
+        with self._lock:
+            if len(self._waiters) >= self._queue_depth:
+                raise self._full()
+
+    async def acquire(self) -> float:
+        """
+        Занять слот (из event loop): сразу или после ожидания в очереди.
+        Возвращает момент занятия (для release). AdmissionRejected — очередь полна или таймаут.
+        """
+        with self._lock:
+            if self._try_take():
+                return time.monotonic()
+            if len(self._waiters) >= self._queue_depth:
+                raise self._full()
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._enqueue(waiter)
+
+        start = time.monotonic()
+        try:
+            await waiter.wait_async(self._queue_timeout)
+        except BaseException as e:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+                    self._update_gauges()
+            if granted:
+                # Слот передан в момент отмены — возвращаем его следующему
+                self.release(time.monotonic())
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._timed_out() from None
+            raise
+        report_admission_wait_seconds.observe(time.monotonic() - start)
+        return time.monotonic()
+
+    def acquire_blocking(self) -> float:
+        """То же из потока (задания, пакетная выгрузка): та же очередь и тот же таймаут."""
+        with self._lock:
+            if self._try_take():
+                return time.monotonic()
+            if len(self._waiters) >= self._queue_depth:
+                raise self._full()
+            waiter = _Waiter()
+            self._enqueue(waiter)
+
+        start = time.monotonic()
+        if not waiter.wait_blocking(self._queue_timeout):
+            with self._lock:
+                # Слот мог быть передан между таймаутом и захватом блокировки
+                if not waiter.granted:
+                    self._waiters.remove(waiter)
+                    self._update_gauges()
+                    raise self._timed_out()
+        report_admission_wait_seconds.observe(time.monotonic() - start)
+        return time.monotonic()
+
+    def release(self, acquired_at: float) -> None:
+        """Освободить слот: передать первому ожидающему или вернуть в пул."""
+        held = time.monotonic() - acquired_at
+        with self._lock:
+            self._avg_hold += (held - self._avg_hold) * 0.2
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                waiter.wake()
+            else:
+                self._active -= 1
+            self._update_gauges()
+
+    @asynccontextmanager
+    async def slot(self, client: str | None = None) -> AsyncIterator[None]:
+        """
+        Слот на время блока (из event loop); ожидание — этап admission в Server-Timing.
+        С client сначала тратится токен клиента; отказ очереди возвращает его.
+        """
+        if client is not None:
+            self.check_rate(client)
+        with report_stage("admission"):
+            try:
+                acquired_at = await self.acquire()
+            except AdmissionRejected:
+                if client is not None:
+                    self.refund_rate(client)
+                raise
+        try:
+            yield
+        finally:
+            self.release(acquired_at)
+
+    @contextmanager
+    def blocking_slot(self) -> Iterator[None]:
+        """То же из потока (задания, пакетная выгрузка)."""
+        with report_stage("admission"):
+            acquired_at = self.acquire_blocking()
+        try:
+            yield
+        finally:
+            self.release(acquired_at)
+
+    def _try_take(self) -> bool:
+        # Вызывается под self._lock; при ожидающих — в очередь, чтобы не обгонять их
+        if self._waiters or (self._limit > 0 and self._active >= self._limit):
+            return False
+        self._active += 1
+        self._update_gauges()
+        return True
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        self._waiters.append(waiter)
+        report_admission_queued_total.inc()
+        self._update_gauges()
+
+    def _full(self) -> AdmissionRejected:
+        # Вызывается под self._lock
+        report_admission_rejected_total.labels(reason="queue_full").inc()
+        return AdmissionRejected("queue_full", self._retry_after(), "Report queue is full")
+
+    def _timed_out(self) -> AdmissionRejected:
+        report_admission_rejected_total.labels(reason="queue_timeout").inc()
+        return AdmissionRejected("queue_timeout", self._retry_after(), "Timed out waiting for a report slot")
+
+    def _retry_after(self) -> int:
+        """Оценка, через сколько секунд очередь продвинется: ожидающие × среднее время / слоты."""
+        slots = max(self._limit, 1)
+        return _clamp_retry(self._avg_hold * (len(self._waiters) + 1) / slots)
+
+    def _update_gauges(self) -> None:
+        report_admission_active.set(self._active)
+        report_admission_queue_depth.set(len(self._waiters))
+
+
+def _clamp_retry(seconds: float) -> int:
+    return min(max(math.ceil(seconds), MIN_RETRY_AFTER), MAX_RETRY_AFTER)
+
+
+def client_key(request: Request) -> str:
+    """Ключ клиента для token bucket: заголовок report_client_header (первый адрес) или адрес соединения."""
+    header = get_settings().report_client_header
+    if header:
+        value = request.headers.get(header)
+        if value:
+            return value.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+_admission: ReportAdmission | None = None
+_admission_lock = threading.Lock()
+
+
+def get_report_admission() -> ReportAdmission:
+    global _admission
+    if _admission is None:
+        with _admission_lock:
+            if _admission is None:
+                settings = get_settings()
+                _admission = ReportAdmission(
+                    max_concurrency=settings.report_max_concurrency,
+                    queue_depth=settings.report_queue_depth,
+                    queue_timeout=settings.report_queue_timeout,
+                    rate_per_minute=settings.report_rate_per_minute,
+                    burst=settings.report_rate_burst,
+                )
+    return _admission
@@ -0,0 +1,315 @@
+"""
+Пул долгоживущих процессов LibreOffice (headless) для конвертации docx -> pdf.
+
+Холодный старт LibreOffice занимает секунды CPU и сотни МБ памяти, поэтому воркеры
+запускаются один раз (в lifespan приложения) и переиспользуются между запросами.
+Каждый воркер — процесс app/services/uno_worker.py со своим soffice и своим профилем.
+Воркер перезапускается после converter_max_conversions конвертаций, по таймауту,
+если процесс упал или нарушил протокол. Ошибка конвертации самого документа
+({"ok": false}) воркер не перезапускает — процесс исправен.
+"""
+
+import json
+import os
+import queue
+import select
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import structlog
+
+from app.config import get_settings
+from app.metrics import (
+    report_converter_queue_depth,
+    report_converter_restarts_total,
+    report_converter_workers,
+)
+
+log = structlog.get_logger()
+
+WORKER_SCRIPT = Path(__file__).resolve().with_name("uno_worker.py")
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class ConverterPoolBusy(RuntimeError):
+    """Все воркеры заняты, а очередь ожидания заполнена (или ожидание истекло)."""
+
+
+class ConverterError(RuntimeError):
+    """Воркер не смог сконвертировать документ (ошибка, падение процесса, таймаут)."""
+
+
+class ConversionFailed(ConverterError):
+    """Воркер исправен, но вернул {"ok": false} — ошибка в самом документе."""
+
+
+class _Worker:
+    """Один процесс uno_worker.py с собственным soffice."""
+
+    def __init__(self, index: int, python: str, soffice: str, profile_dir: Path, timeout: float):
+        self.index = index
+        self._python = python
+        self._soffice = soffice
+        self._profile_dir = profile_dir
+        self._timeout = timeout
+        self._proc: subprocess.Popen | None = None
+        self._ready = False
+        self._buffer = bytearray()  # прочитанное из stdout после последней полной строки
+        self.conversions = 0
+
+    def start(self) -> None:
+        """Запустить процесс; готовность проверяется при первой конвертации."""
+        self._proc = subprocess.Popen(
+            [
+                self._python,
+                str(WORKER_SCRIPT),
+                "--soffice",
+                self._soffice,
+                "--profile",
+                str(self._profile_dir),
+                "--startup-timeout",
+                str(self._timeout),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            # Своя группа процессов: при остановке завершаем и воркер, и его soffice
+            start_new_session=True,
+        )
+        self._ready = False
+        self._buffer.clear()
+        self.conversions = 0
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def stop(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except Exception:
+            pass
+        if proc.poll() is None or _group_alive(proc.pid):
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.wait()
+
+    def convert(self, docx_paths: list[Path], out_dir: Path, timeout: float) -> None:
+        if not self._ready:
+            message = self._read_message(self._timeout)
+            if not message.get("ready"):
+                raise ConverterError(f"worker failed to start: {message.get('error', 'unknown')}")
+            self._ready = True
+        request = {"files": [str(p) for p in docx_paths], "outdir": str(out_dir)}
+        try:
+            self._proc.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise ConverterError(f"worker is gone: {e}") from e
+        message = self._read_message(timeout)
+        self.conversions += 1
+        if not message.get("ok"):
+            raise ConversionFailed(message.get("error", "conversion failed"))
+
+    def _read_message(self, timeout: float) -> dict:
+        """
+        Прочитать одну JSON-строку из stdout воркера не дольше timeout секунд.
+        Строка собирается из os.read дескриптора (файловый объект stdout не читается,
+        его буфер не прячет данные от select): частичная строка не блокирует после
+        дедлайна, прочитанный хвост не теряется между вызовами.
+        """
+        fd = self._proc.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        while (end := self._buffer.find(b"\n")) == -1:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(str(WORKER_SCRIPT), timeout)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, READ_CHUNK_SIZE)
+            if not chunk:
+                raise ConverterError("worker exited")
+            self._buffer += chunk
+        line = bytes(self._buffer[:end])
+        del self._buffer[:end + 1]
+        message = json.loads(line)
+        if not isinstance(message, dict):
+            raise ValueError(f"unexpected worker message: {line[:200]!r}")
+        return message
+
+
+def _group_alive(pgid: int) -> bool:
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except (ProcessLookupError, PermissionError):
+        return False
+
+
+class ConverterPool:
+    """Пул воркеров: каждой конвертации выдаётся свободный воркер."""
+
+    def __init__(
+        self,
+        size: int,
+        queue_depth: int,
+        timeout: float,
+        max_conversions: int,
+        python: str,
+        soffice: str,
+        profile_root: Path,
+    ):
+        self._queue_depth = queue_depth
+        self._timeout = timeout
+        self._max_conversions = max_conversions
+        self._workers = [
+            _Worker(i, python, soffice, profile_root / f"lo_profile_{i}", timeout)
+            for i in range(size)
+        ]
+        self._idle: queue.LifoQueue[_Worker] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._busy = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._workers)
+
+    def start(self) -> None:
+        for worker in self._workers:
+            worker.start()
+            self._idle.put(worker)
+        self._update_gauges()
+
+    def stop(self) -> None:
+        for worker in self._workers:
+            worker.stop()
+        report_converter_workers.labels(state="idle").set(0)
+        report_converter_workers.labels(state="busy").set(0)
+
+    def healthy(self) -> bool:
+        """Хотя бы один воркер жив (упавшие перезапускаются при следующей выдаче)."""
+        return any(worker.alive() for worker in self._workers)
+
+    def convert(self, docx_paths: list[Path], out_dir: Path) -> None:
+        """
+        Сконвертировать файлы в PDF (в out_dir) одним запросом к свободному воркеру.
+        Таймаут — converter_timeout на каждый файл.
+        """
+        timeout = self._timeout * max(len(docx_paths), 1)
+        worker = self._acquire()
+        try:
+            if not worker.alive():
+                self._restart(worker, "crash")
+            worker.convert(docx_paths, out_dir, timeout)
+        except subprocess.TimeoutExpired as e:
+            self._restart(worker, "timeout")
+            raise ConverterError(f"conversion timed out after {timeout}s") from e
+        except ConversionFailed:
+            # Документ не сконвертировался, процесс исправен — перезапуск не нужен
+            if worker.conversions >= self._max_conversions:
+                self._restart(worker, "recycle")
+            raise
+        except (ConverterError, ValueError) as e:
+            # Процесс упал или нарушил протокол (не JSON в ответе)
+            self._restart(worker, "crash")
+            raise ConverterError(str(e)) from e
+        else:
+            if worker.conversions >= self._max_conversions:
+                self._restart(worker, "recycle")
+        finally:
+            self._release(worker)
+
+    def _acquire(self) -> _Worker:
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._waiting >= self._queue_depth:
+                    raise ConverterPoolBusy("Converter queue is full")
+                self._waiting += 1
+            self._update_gauges()
+            try:
+                worker = self._idle.get(timeout=self._timeout)
+            except queue.Empty:
+                raise ConverterPoolBusy("Timed out waiting for a free converter")
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        with self._lock:
+            self._busy += 1
+        self._update_gauges()
+        return worker
+
+    def _release(self, worker: _Worker) -> None:
+        with self._lock:
+            self._busy -= 1
+        self._idle.put(worker)
+        self._update_gauges()
+
+    def _restart(self, worker: _Worker, reason: str) -> None:
+        log.info("Restarting converter worker", worker=worker.index, reason=reason)
+        report_converter_restarts_total.labels(reason=reason).inc()
+        worker.stop()
+        worker.start()
+
+    def _update_gauges(self) -> None:
+        report_converter_workers.labels(state="busy").set(self._busy)
+        report_converter_workers.labels(state="idle").set(self.size - self._busy)
+        report_converter_queue_depth.set(self._waiting)
+
+
+_pool: ConverterPool | None = None
+
+
+def get_converter_pool() -> ConverterPool | None:
+    """Текущий пул или None (пул выключен или LibreOffice/uno недоступны)."""
+    return _pool
+
+
+def start_converter_pool() -> ConverterPool | None:
+    """Запустить пул воркеров (вызывается в lifespan приложения)."""
+    global _pool
+    settings = get_settings()
+    if settings.converter_pool_size <= 0:
+        return None
+    python = shutil.which(settings.converter_python)
+    soffice = shutil.which(settings.libreoffice_binary)
+    if python is None or soffice is None:
+        # Локальная разработка без LibreOffice: остаётся разовая конвертация
+        log.warning(
+            "Converter pool disabled: LibreOffice or uno python not found",
+            python=settings.converter_python,
+            soffice=settings.libreoffice_binary,
+        )
+        return None
+    _pool = ConverterPool(
+        size=settings.converter_pool_size,
+        queue_depth=settings.converter_queue_depth,
+        timeout=settings.converter_timeout,
+        max_conversions=settings.converter_max_conversions,
+        python=python,
+        soffice=soffice,
+        profile_root=Path(settings.temp_dir or "/tmp"),
+    )
+    _pool.start()
+    log.info("Converter pool started", size=_pool.size)
+    return _pool
+
+
+def stop_converter_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.stop()
+        log.info("Converter pool stopped")
@@ -0,0 +1,32 @@
+"""
+Сетка занятий за год (GET /api/lessons/grid): все записи всех студентов одним запросом.
+
+Ответ колоночный — параллельные массивы одинаковой длины (i-й элемент каждого
+массива относится к i-й записи) вместо списка объектов: имена полей не повторяются
+в каждой записи, ответ меньше и быстрее сериализуется. Строки идут по (student_id, month);
+запрос читает только нужные столбцы по индексу ix_lesson_records_year_student_month
+(фильтр по году и порядок без сортировки), ORM-объекты не создаются.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import LessonRecord
+
+GRID_COLUMNS = ("student_id", "month", "hours_studied", "grammar_e", "reading_e", "speaking_e", "writing_e")
+TEXT_COLUMNS = {"grammar_e", "reading_e", "speaking_e", "writing_e"}
+
+
+def get_lesson_grid(db: Session, year: int) -> dict:
+    """{"year": year, "count": n, <столбец>: [значения]...} по всем записям за год."""
+    rows = db.execute(
+        select(*(getattr(LessonRecord, column) for column in GRID_COLUMNS))
+        .where(LessonRecord.year == year)
+        .order_by(LessonRecord.student_id, LessonRecord.month)
+    ).all()
+    columns = list(zip(*rows)) if rows else [()] * len(GRID_COLUMNS)
+    grid = {"year": year, "count": len(rows)}
+    for name, values in zip(GRID_COLUMNS, columns):
+        # Пустые текстовые поля в БД могут быть NULL — в ответе всегда строки
+        grid[name] = [value or "" for value in values] if name in TEXT_COLUMNS else list(values)
+    return grid
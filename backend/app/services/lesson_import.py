@@ -0,0 +1,180 @@
+"""
+Потоковый импорт записей занятий (POST /api/lessons/bulk).
+
+Тело запроса — NDJSON (одна запись LessonRecordCreate на строку) или CSV с заголовком.
+Тело читается по частям, строки валидируются по одной и сохраняются пачками
+(lesson_bulk_batch_size) пакетным upsert. Результаты строк пачки (в порядке строк
+загрузки, с номером строки line) отдаются клиенту сразу после её commit, поэтому
+расход памяти ограничен пачкой, а не размером загрузки.
+"""
+
+import csv
+import json
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.db_instrumentation import batched_statements
+from app.metrics import lessons_saved_total, track_db_operation
+from app.schemas import LessonRecordCreate
+from app.services.lessons import existing_student_ids, upsert_lesson_records
+from app.services.pdf_cache import get_pdf_cache
+
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+CSV_MEDIA_TYPES = {"text/csv", "application/csv"}
+
+# Строка длиннее — ошибка этой строки (защита от тела без переводов строк)
+MAX_LINE_BYTES = 64 * 1024
+
+
+@dataclass
+class ImportRow:
+    """Строка загрузки: номер строки, данные (или ошибка разбора)."""
+
+    line: int
+    data: dict | None = None
+    error: str | None = None
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes | None]:
+    """Строки тела без перевода строки; None — строка длиннее MAX_LINE_BYTES."""
+    buffer = bytearray()
+    skipping = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                if not skipping:
+                    buffer += chunk[start:]
+                    if len(buffer) > MAX_LINE_BYTES:
+                        buffer.clear()
+                        skipping = True
+                        yield None
+                break
+            if skipping:
+                skipping = False
+            else:
+                buffer += chunk[start:end]
+                yield bytes(buffer) if len(buffer) <= MAX_LINE_BYTES else None
+            buffer.clear()
+            start = end + 1
+    if buffer and not skipping:
+        yield bytes(buffer)
+
+
+def _decode(raw: bytes, first: bool) -> str:
+    text = raw.decode("utf-8-sig" if first else "utf-8")
+    return text.rstrip("\r")
+
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    line_no = 0
+    async for raw in _iter_lines(chunks):
+        line_no += 1
+        if raw is None:
+            yield ImportRow(line_no, error="Line is too long")
+            continue
+        try:
+            text = _decode(raw, line_no == 1)
+            if not text.strip():
+                continue
+            data = json.loads(text)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            yield ImportRow(line_no, error=f"Invalid JSON: {e}")
+            continue
+        if not isinstance(data, dict):
+            yield ImportRow(line_no, error="Expected a JSON object")
+            continue
+        yield ImportRow(line_no, data=data)
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    """CSV с заголовком; поле в кавычках может занимать несколько строк."""
+    header: list[str] | None = None
+    line_no = 0
+    pending: list[str] = []
+    pending_start = 0
+    async for raw in _iter_lines(chunks):
+        line_no += 1
+        if raw is None:
+            pending = []
+            yield ImportRow(line_no, error="Line is too long")
+            continue
+        try:
+            text = _decode(raw, line_no == 1)
+        except UnicodeDecodeError as e:
+            pending = []
+            yield ImportRow(line_no, error=f"Invalid UTF-8: {e}")
+            continue
+        if not pending:
+            pending_start = line_no
+        pending.append(text)
+        record = "\n".join(pending)
+        # Нечётное число кавычек — запись продолжается на следующей строке
+        if record.count('"') % 2:
+            continue
+        pending = []
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield ImportRow(pending_start, error=f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        # Пустые ячейки — «не задано»: для необязательных полей берутся значения по умолчанию
+        yield ImportRow(pending_start, data={k: v for k, v in zip(header, values) if v != ""})
+    if pending:
+        yield ImportRow(pending_start, error="Unterminated quoted field")
+
+
+def _result_line(result: dict) -> bytes:
+    return json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def save_batch(db: Session, batch: list[tuple[int, LessonRecordCreate | list[str]]]) -> tuple[int, bytes]:
+    """
+    Сохранить пачку (номер строки и данные или ошибки проверки) одним commit.
+    Возвращает число сохранённых и NDJSON результатов всех строк в порядке загрузки.
+    """
+    valid = [row for _, row in batch if isinstance(row, LessonRecordCreate)]
+    known: set[int] = set()
+    rows: list[LessonRecordCreate] = []
+    if valid:
+        # Одни и те же запросы на каждую пачку — не N+1
+        with track_db_operation("lesson_bulk_save"), batched_statements():
+            known = existing_student_ids(db, {row.student_id for row in valid})
+            rows = [row for row in valid if row.student_id in known]
+            upsert_lesson_records(db, rows)
+            db.commit()
+
+    cache = get_pdf_cache()
+    results = bytearray()
+    for line, row in batch:
+        if not isinstance(row, LessonRecordCreate):
+            results += _result_line({"line": line, "status": "error", "errors": row})
+        elif row.student_id in known:
+            cache.invalidate(row.student_id, row.year, row.month)
+            results += _result_line({"line": line, "status": "ok"})
+        else:
+            results += _result_line({"line": line, "status": "error", "errors": ["Student not found"]})
+    lessons_saved_total.inc(len(rows))
+    return len(rows), bytes(results)
+
+
+def validate_row(row: ImportRow) -> LessonRecordCreate | list[str]:
+    """Проверить строку по схеме: данные или список ошибок (результат пишет save_batch)."""
+    if row.error is not None:
+        return [row.error]
+    try:
+        return LessonRecordCreate.model_validate(row.data)
+    except ValidationError as e:
+        return [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()]
+
+
+def summary_line(rows: int, saved: int) -> bytes:
+    return _result_line({"summary": {"rows": rows, "saved": saved, "failed": rows - saved}})
@@ -0,0 +1,124 @@
+"""
+Сохранение записей занятий одним запросом (upsert по student_id + year + month).
+
+Опирается на уникальный индекс uq_lesson_records_student_year_month: вместо
+SELECT + UPDATE/INSERT + refresh выполняется один INSERT … ON DUPLICATE KEY UPDATE
+(MySQL) или INSERT … ON CONFLICT DO UPDATE (SQLite — локальная разработка, бенчмарки).
+Несуществующий студент определяется по ошибке внешнего ключа, без отдельного запроса.
+Пакетное сохранение (bulk-импорт) — тот же запрос через executemany.
+Для прочих диалектов — SELECT … FOR UPDATE и UPDATE или INSERT по строке.
+В той же транзакции пересчитывается годовая сводка (app/services/summary.py).
+"""
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import LessonRecord, Student
+from app.schemas import LessonRecordCreate
+from app.services.summary import refresh_year_summaries
+
+# Поля, которые перезаписываются при повторном сохранении за тот же месяц
+LESSON_FIELDS = ("grammar_e", "reading_e", "speaking_e", "writing_e", "hours_studied")
+
+# MySQL: Cannot add or update a child row: a foreign key constraint fails
+MYSQL_ER_NO_REFERENCED_ROW = 1452
+
+
+def is_foreign_key_violation(error: IntegrityError) -> bool:
+    orig = error.orig
+    if getattr(orig, "args", None) and orig.args[0] == MYSQL_ER_NO_REFERENCED_ROW:
+        return True
+    # SQLite: «FOREIGN KEY constraint failed», PostgreSQL: «violates foreign key constraint»
+    return "foreign key constraint" in str(orig).lower()
+
+
+def upsert_lesson_record(db: Session, data: LessonRecordCreate) -> int | None:
+    """
+    Создать или обновить запись занятия; вернуть её id.
+    None — студента нет (транзакция откатывается). Commit — за вызывающим кодом.
+    """
+    values = data.model_dump(include={"student_id", "year", "month", *LESSON_FIELDS})
+    dialect = db.get_bind().dialect.name
+    try:
+        if dialect == "mysql":
+            stmt = mysql.insert(LessonRecord).values(**values)
+            # LAST_INSERT_ID(id) — id существующей строки попадает в lastrowid и при UPDATE
+            stmt = stmt.on_duplicate_key_update(
+                id=func.last_insert_id(LessonRecord.id),
+                **{field: stmt.inserted[field] for field in LESSON_FIELDS},
+            )
+            record_id = db.execute(stmt).lastrowid
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(LessonRecord).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[LessonRecord.student_id, LessonRecord.year, LessonRecord.month],
+                set_={field: stmt.excluded[field] for field in LESSON_FIELDS},
+            ).returning(LessonRecord.id)
+            record_id = db.execute(stmt).scalar_one()
+        else:
+            record_id = _select_then_upsert(db, values)
+    except IntegrityError as e:
+        db.rollback()
+        if is_foreign_key_violation(e):
+            return None
+        raise
+    refresh_year_summaries(db, {(data.student_id, data.year)})
+    return record_id
+
+
+def upsert_lesson_records(db: Session, rows: list[LessonRecordCreate]) -> None:
+    """
+    Пакетный upsert одним executemany. Студенты должны существовать
+    (см. existing_student_ids). Commit — за вызывающим кодом.
+    """
+    if not rows:
+        return
+    params = [row.model_dump(include={"student_id", "year", "month", *LESSON_FIELDS}) for row in rows]
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(LessonRecord)
+        stmt = stmt.on_duplicate_key_update(**{field: stmt.inserted[field] for field in LESSON_FIELDS})
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(LessonRecord)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LessonRecord.student_id, LessonRecord.year, LessonRecord.month],
+            set_={field: stmt.excluded[field] for field in LESSON_FIELDS},
+        )
+    else:
+        stmt = None
+    if stmt is not None:
+        db.execute(stmt, params)
+    else:
+        for values in params:
+            _select_then_upsert(db, values)
+    refresh_year_summaries(db, {(row.student_id, row.year) for row in rows})
+
+
+def _select_then_upsert(db: Session, values: dict) -> int:
+    """Upsert без диалектного INSERT … ON CONFLICT: строка блокируется, затем UPDATE или INSERT."""
+    record = db.scalar(
+        select(LessonRecord)
+        .where(
+            LessonRecord.student_id == values["student_id"],
+            LessonRecord.year == values["year"],
+            LessonRecord.month == values["month"],
+        )
+        .with_for_update()
+    )
+    if record is None:
+        record = LessonRecord(**values)
+        db.add(record)
+    else:
+        for field in LESSON_FIELDS:
+            setattr(record, field, values[field])
+    db.flush()
+    return record.id
+
+
+def existing_student_ids(db: Session, student_ids: set[int]) -> set[int]:
+    """Какие из student_ids есть в таблице students (один запрос на пачку)."""
+    if not student_ids:
+        return set()
+    return set(db.scalars(select(Student.id).where(Student.id.in_(student_ids))))
@@ -0,0 +1,195 @@
+"""
+Встроенный генератор PDF-отчёта (без LibreOffice и без шаблона .docx).
+
+Отчёт собирается напрямую из контекста get_report_context() библиотекой fpdf2:
+русский блок (слева направо) и блок на иврите (справа налево), как в шаблоне.
+Строки на иврите переносятся по словам в логическом порядке, а затем каждая
+строка переставляется в визуальный порядок (алгоритм bidi из fpdf2), поэтому
+для RTL не нужен harfbuzz.
+
+Разбор TTF-шрифта — самая дорогая часть, поэтому шрифты один раз урезаются до нужных
+алфавитов (латиница, кириллица, иврит), подключаются к документу-прототипу,
+а каждый отчёт начинается с копии прототипа. Рендер — десятки миллисекунд, без процессов.
+"""
+
+import copy
+import io
+import threading
+from pathlib import Path
+
+from app.config import get_settings
+
+# Меняется при изменении вёрстки — входит в ключ кэша PDF
+LAYOUT_VERSION = "1"
+
+FONT_FAMILY = "ReportFont"
+LINE_HEIGHT = 7.0
+
+# Алфавиты отчёта: латиница, кириллица, иврит, типографская пунктуация, ₪
+FONT_UNICODE_RANGES = [
+    (0x0020, 0x007E),
+    (0x00A0, 0x00FF),
+    (0x0400, 0x04FF),
+    (0x0590, 0x05FF),
+    (0x2000, 0x206F),
+    (0x20AA, 0x20AA),
+]
+
+SKILLS_RU = [
+    ("SpeakingE", "Улучшение навыка разговорной речи по темам:"),
+    ("GrammarE", "Улучшение грамматических навыков:"),
+    ("WritingE", "Улучшение навыков письма по теме:"),
+    ("ReadingE", "Улучшение навыков чтения по теме:"),
+]
+
+SKILLS_HE = [
+    ("SpeakingE", "1. שיפור מיומנויות הדיבור בנושאים:"),
+    ("GrammarE", "2. שיפור מיומנויות הדקדוק:"),
+    ("WritingE", "3. שיפור את כישורי כתיבת הנושא:"),
+    ("ReadingE", "4. שיפור מיומנויות הקריאה בנושאים:"),
+]
+
+
+def _visual_order(text: str) -> str:
+    """Строка RTL-абзаца в визуальном порядке (слева направо, как её рисует PDF)."""
+    from fpdf.bidi import BidiParagraph
+    from fpdf.enums import TextDirection
+
+    fragments = BidiParagraph(text=text, base_direction=TextDirection.RTL).get_bidi_fragments()
+    return "".join(
+        fragment[::-1] if direction == TextDirection.RTL else fragment
+        for fragment, direction in reversed(fragments)
+    )
+
+
+def _wrap_words(pdf, text: str, width: float) -> list[str]:
+    """Перенос по словам в логическом порядке по ширине строки."""
+    lines: list[str] = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and pdf.get_string_width(candidate) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines or [""]
+
+
+def _rtl_paragraph(pdf, text: str, align: str = "R") -> None:
+    width = pdf.epw
+    for line in _wrap_words(pdf, text, width):
+        pdf.cell(width, LINE_HEIGHT, _visual_order(line), align=align, new_x="LMARGIN", new_y="NEXT")
+
+
+def _ltr_paragraph(pdf, text: str, align: str = "L") -> None:
+    pdf.multi_cell(0, LINE_HEIGHT, text, align=align, new_x="LMARGIN", new_y="NEXT")
+
+
+def _subset_font(src: str, out_dir: Path) -> Path:
+    """Копия шрифта только с глифами FONT_UNICODE_RANGES (в разы быстрее разбор и вывод)."""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_path = out_dir / f"{Path(src).stem}.subset.ttf"
+    options = subset.Options()
+    options.layout_features = []
+    options.name_IDs = ["*"]
+    options.hinting = False
+    options.notdef_outline = True
+    options.drop_tables += ["FFTM"]
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(
+        unicodes=[code for first, last in FONT_UNICODE_RANGES for code in range(first, last + 1)]
+    )
+    font = TTFont(src)
+    subsetter.subset(font)
+    font.save(str(out_path))
+    return out_path
+
+
+_prototype = None
+_prototype_lock = threading.Lock()
+_font_data: dict[str, bytes] = {}
+
+
+def _new_document():
+    """
+    Новый документ: копия прототипа с уже подключёнными шрифтами.
+
+    fpdf2 при копировании разделяет объект TTFont между копиями, а при output()
+    урезает его на месте под глифы документа — поэтому каждой копии даётся свой
+    TTFont, открытый из байтов уже урезанного файла (ленивый разбор, доли миллисекунды).
+    """
+    global _prototype
+    if _prototype is None:
+        with _prototype_lock:
+            if _prototype is None:
+                from fpdf import FPDF  # тяжёлый импорт — только при первом рендере
+
+                settings = get_settings()
+                font_dir = Path(settings.temp_dir or "/tmp") / "report_fonts"
+                pdf = FPDF(format="A4")
+                pdf.set_auto_page_break(True, margin=15)
+                pdf.add_font(FONT_FAMILY, fname=_subset_font(settings.report_font_path, font_dir))
+                pdf.add_font(
+                    FONT_FAMILY,
+                    style="B",
+                    fname=_subset_font(settings.report_font_bold_path, font_dir),
+                )
+                for font in pdf.fonts.values():
+                    _font_data[str(font.ttffile)] = Path(font.ttffile).read_bytes()
+                _prototype = pdf
+
+    from fontTools.ttLib import TTFont
+
+    pdf = copy.deepcopy(_prototype)
+    for font in pdf.fonts.values():
+        font.ttfont = TTFont(io.BytesIO(_font_data[str(font.ttffile)]), recalcTimestamp=False, lazy=True)
+    return pdf
+
+
+def render_native_pdf(context: dict) -> bytes:
+    """Построить PDF-отчёт из контекста подстановки."""
+    pdf = _new_document()
+    pdf.set_title(f"Report {context['first_name']} {context['last_name']} {context['month']}.{context['year']}")
+    pdf.add_page()
+
+    # Русский блок
+    pdf.set_font(FONT_FAMILY, "B", 14)
+    _ltr_paragraph(
+        pdf,
+        f"Достижения {context['first_name']} {context['last_name']}. "
+        f"{context['month_ru']} {context['year']}.",
+        align="C",
+    )
+    pdf.ln(LINE_HEIGHT / 2)
+    pdf.set_font(FONT_FAMILY, "", 11)
+    for number, (key, label) in enumerate(SKILLS_RU, start=1):
+        _ltr_paragraph(pdf, f"{number}. {label} {context[key]}")
+    pdf.ln(LINE_HEIGHT / 2)
+    _ltr_paragraph(pdf, f"Проведено {context['hours_studied']} уроков")
+
+    pdf.ln(LINE_HEIGHT * 2)
+
+    # Блок на иврите (справа налево)
+    pdf.set_font(FONT_FAMILY, "B", 14)
+    _rtl_paragraph(
+        pdf,
+        f"הישגיה של {context['first_name_he']} {context['last_name_he']} "
+        f"{context['month_he']} {context['year']}",
+        align="C",
+    )
+    pdf.ln(LINE_HEIGHT / 2)
+    pdf.set_font(FONT_FAMILY, "", 11)
+    for key, label in SKILLS_HE:
+        _rtl_paragraph(pdf, label)
+        # Значения полей — английский текст: переносим как LTR, выравниваем вправо
+        _ltr_paragraph(pdf, context[key], align="R")
+    pdf.ln(LINE_HEIGHT / 2)
+    _rtl_paragraph(pdf, f"{context['hours_studied']} שיעורים נלמדים")
+
+    return bytes(pdf.output())
@@ -0,0 +1,183 @@
+"""
+Подстановка плейсхолдеров в .docx напрямую в XML — без объектной модели python-docx.
+
+Компиляция (один раз на версию шаблона): части word/document.xml, word/headerN.xml
+и word/footerN.xml разбираются регулярным выражением на параграфы (<w:p>, в том числе
+вложенные — ячейки таблиц, надписи) и текстовые узлы <w:t>. Текст параграфа
+склеивается, и плейсхолдеры [[ key ]] ищутся в нём целиком — Word часто разбивает
+их на несколько run'ов. Значение встаёт в run, где начинается плейсхолдер (с его
+форматированием), остатки плейсхолдера в следующих run'ах вырезаются; остальной XML
+не меняется. Часть превращается в чередование готовых фрагментов XML (уже в UTF-8)
+и ключей. Остальные файлы архива один раз упаковываются в «базовый» zip.
+
+Рендер: копия базового zip (байты как есть) и дописанные в него переписанные части
+без сжатия — файл живёт только до конвертации, а deflate стоит и времени, и памяти.
+Значения экранируются для XML, \\n и \\t становятся <w:br/> и <w:tab/> (как при
+присваивании Paragraph.text в python-docx).
+"""
+
+import io
+import re
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO
+
+# Части с текстом документа, в которых ищутся плейсхолдеры
+REWRITTEN_PARTS = re.compile(r"word/(document|header\d*|footer\d*)\.xml")
+
+_TOKENS = re.compile(
+    r"(?P<p_open><w:p(?:\s[^>]*)?(?<!/)>)"
+    r"|(?P<p_close></w:p>)"
+    r"|(?P<t_open><w:t(?:\s[^>]*)?(?<!/)>)(?P<text>[^<]*)</w:t>"
+)
+_PRESERVE_SPACE = re.compile(r'\sxml:space="preserve"')
+_INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_BREAK = '</w:t><w:br/><w:t xml:space="preserve">'
+_TAB = '</w:t><w:tab/><w:t xml:space="preserve">'
+
+
+def escape_text(value: str) -> str:
+    """Значение -> содержимое <w:t>: экранирование XML, переводы строк и табуляции."""
+    value = _INVALID_XML_CHARS.sub("", value)
+    value = value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if "\n" in value or "\t" in value:
+        value = value.replace("\r\n", "\n").replace("\n", _BREAK).replace("\t", _TAB)
+    return value
+
+
+@dataclass(frozen=True)
+class _TextNode:
+    tag_start: int  # начало <w:t ...>
+    text_start: int
+    text_end: int  # конец текста (перед </w:t>)
+    tag: str
+
+
+@dataclass(frozen=True)
+class CompiledPart:
+    """Часть документа: literals[0] + value(keys[0]) + literals[1] + ... + literals[-1]."""
+
+    name: str
+    literals: tuple[bytes, ...]
+    keys: tuple[str, ...]
+
+    def render(self, values: dict[str, bytes]) -> bytes:
+        out = [self.literals[0]]
+        for key, literal in zip(self.keys, self.literals[1:]):
+            out.append(values.get(key, b""))
+            out.append(literal)
+        return b"".join(out)
+
+
+def _node_cuts(
+    nodes: list[_TextNode], xml: str, pattern: re.Pattern
+) -> dict[int, list[tuple[int, int, str | None]]]:
+    """
+    Плейсхолдеры параграфа -> вырезаемые участки текстовых узлов:
+    {индекс узла: [(начало, конец, ключ или None)]}, позиции — внутри текста узла.
+    """
+    texts = [xml[node.text_start:node.text_end] for node in nodes]
+    offsets = []
+    position = 0
+    for text in texts:
+        offsets.append(position)
+        position += len(text)
+    joined = "".join(texts)
+
+    cuts: dict[int, list[tuple[int, int, str | None]]] = {}
+    for match in pattern.finditer(joined):
+        start, end = match.span()
+        first = True
+        for index, (offset, text) in enumerate(zip(offsets, texts)):
+            node_start, node_end = max(start, offset), min(end, offset + len(text))
+            if node_start >= node_end:
+                continue
+            cuts.setdefault(index, []).append(
+                (node_start - offset, node_end - offset, match.group(1) if first else None)
+            )
+            first = False
+    return cuts
+
+
+def compile_part(name: str, xml: str, pattern: re.Pattern) -> CompiledPart:
+    """Разобрать XML части и подготовить чередование строк и ключей (pattern — группа 1 = ключ)."""
+    # Текстовые узлы каждого (самого внутреннего) параграфа
+    stack: list[list[_TextNode]] = []
+    edits: dict[int, list[tuple[int, int, str | None]]] = {}  # tag_start узла -> вырезы
+    nodes_by_start: dict[int, _TextNode] = {}
+    for token in _TOKENS.finditer(xml):
+        if token.group("p_open"):
+            stack.append([])
+        elif token.group("p_close"):
+            if stack:
+                nodes = stack.pop()
+                for index, node_cuts in _node_cuts(nodes, xml, pattern).items():
+                    edits[nodes[index].tag_start] = node_cuts
+                    nodes_by_start[nodes[index].tag_start] = nodes[index]
+        elif stack:
+            stack[-1].append(
+                _TextNode(token.start(), token.start("text"), token.end("text"), token.group("t_open"))
+            )
+
+    literals: list[bytes] = []
+    keys: list[str] = []
+    current: list[str] = []
+    position = 0
+    for tag_start in sorted(edits):
+        node = nodes_by_start[tag_start]
+        current.append(xml[position:tag_start])
+        tag = node.tag
+        if not _PRESERVE_SPACE.search(tag):
+            # Значение может начинаться или заканчиваться пробелом
+            tag = tag[:-1] + ' xml:space="preserve">'
+        current.append(tag)
+        text_position = node.text_start
+        for cut_start, cut_end, key in edits[tag_start]:
+            current.append(xml[text_position:node.text_start + cut_start])
+            if key is not None:
+                literals.append("".join(current).encode("utf-8"))
+                keys.append(key)
+                current = []
+            text_position = node.text_start + cut_end
+        current.append(xml[text_position:node.text_end])
+        position = node.text_end
+    current.append(xml[position:])
+    literals.append("".join(current).encode("utf-8"))
+    return CompiledPart(name=name, literals=tuple(literals), keys=tuple(keys))
+
+
+@dataclass(frozen=True)
+class OoxmlTemplate:
+    """Шаблон .docx: базовый zip без переписываемых частей и скомпилированные части."""
+
+    base: bytes
+    parts: tuple[CompiledPart, ...]
+
+    @property
+    def placeholder_count(self) -> int:
+        return sum(len(part.keys) for part in self.parts)
+
+    def render_parts(self, context: dict) -> list[tuple[str, bytes]]:
+        values = {key: escape_text(str(value)).encode("utf-8") for key, value in context.items() if value is not None}
+        return [(part.name, part.render(values)) for part in self.parts]
+
+    def write(self, rendered: list[tuple[str, bytes]], fileobj: BinaryIO) -> None:
+        """Записать .docx: базовый архив как есть и дописанные части (fileobj — с seek)."""
+        fileobj.write(self.base)
+        with zipfile.ZipFile(fileobj, "a", compression=zipfile.ZIP_STORED) as archive:
+            for name, data in rendered:
+                archive.writestr(name, data)
+
+
+def compile_ooxml(data: bytes, pattern: re.Pattern) -> OoxmlTemplate:
+    """Скомпилировать шаблон из байтов .docx (pattern — регулярное выражение плейсхолдера)."""
+    parts = []
+    base = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as source, zipfile.ZipFile(base, "w") as target:
+        for info in source.infolist():
+            content = source.read(info)
+            if REWRITTEN_PARTS.fullmatch(info.filename):
+                parts.append(compile_part(info.filename, content.decode("utf-8"), pattern))
+            else:
+                target.writestr(info, content, compress_type=info.compress_type)
+    return OoxmlTemplate(base=base.getvalue(), parts=tuple(parts))
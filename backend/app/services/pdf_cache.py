@@ -0,0 +1,276 @@
+"""
+Кэш готовых PDF-отчётов.
+
+Ключ — sha256 от контекста подстановки (get_report_context) и версии шаблона:
+одинаковые данные дают тот же ключ, и повторное «Print report» не запускает
+конвертацию. Ключ же служит ETag ответа /api/report/pdf.
+Два уровня: LRU в памяти (ограничен числом записей и суммарным размером) и,
+опционально, файлы в temp_dir/report_cache (тоже LRU, ограничен размером).
+При сохранении занятия записи для (student_id, year, month) удаляются; запись —
+часть имени файла ({student_id}_{year}_{month}_{ключ}.pdf), поэтому и файлы,
+оставшиеся от прошлого запуска, сбрасываются вместе с ней.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import structlog
+
+from app.config import get_settings
+from app.metrics import report_pdf_cache_total
+
+log = structlog.get_logger()
+
+RecordKey = tuple[int, int, int]  # (student_id, year, month)
+
+
+class _DiskFile(NamedTuple):
+    size: int
+    record: RecordKey
+
+
+def make_cache_key(context: dict, template_version: str) -> str:
+    """Ключ кэша: хэш контекста отчёта и версии шаблона."""
+    payload = json.dumps(context, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{template_version}\n{payload}".encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """Двухуровневый LRU-кэш PDF: память и (опционально) диск."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        disk_dir: Path | None = None,
+        disk_max_bytes: int = 0,
+    ):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_dir = disk_dir
+        self._disk_max_bytes = disk_max_bytes
+        self._disk: OrderedDict[str, _DiskFile] = OrderedDict()
+        self._disk_bytes = 0
+        self._records: dict[RecordKey, set[str]] = {}
+        self._lock = threading.Lock()
+        if disk_dir is not None:
+            self._load_disk_index()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                report_pdf_cache_total.labels(tier="memory", result="hit").inc()
+                return data
+            report_pdf_cache_total.labels(tier="memory", result="miss").inc()
+            if self._disk_dir is None:
+                return None
+            entry = self._disk.get(key)
+            if entry is None:
+                report_pdf_cache_total.labels(tier="disk", result="miss").inc()
+                return None
+            self._disk.move_to_end(key)
+        try:
+            data = self._disk_path(key, entry.record).read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self._drop_disk(key)
+            report_pdf_cache_total.labels(tier="disk", result="miss").inc()
+            return None
+        report_pdf_cache_total.labels(tier="disk", result="hit").inc()
+        with self._lock:
+            self._put_memory(key, data)
+        return data
+
+    def lookup(self, key: str, new_dir: Callable[[], Path]) -> bytes | Path | None:
+        """
+        Как get, но попадание в дисковый уровень возвращается файлом без чтения в память
+        (ответ отдаётся файлом): жёсткой ссылкой (или копией) в новом каталоге new_dir(),
+        созданной под блокировкой. Вытеснение удаляет только файл кэша, ссылка остаётся
+        до ответа; каталог (создаётся только при попадании) удаляет вызывающий код.
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                report_pdf_cache_total.labels(tier="memory", result="hit").inc()
+                return data
+            report_pdf_cache_total.labels(tier="memory", result="miss").inc()
+            if self._disk_dir is None:
+                return None
+            entry = self._disk.get(key)
+            if entry is None:
+                report_pdf_cache_total.labels(tier="disk", result="miss").inc()
+                return None
+            self._disk.move_to_end(key)
+            path = self._disk_path(key, entry.record)
+            target = None
+            try:
+                if not path.exists():
+                    raise FileNotFoundError(path)
+                target = new_dir() / path.name
+                _link_or_copy(path, target)
+            except FileNotFoundError:
+                # Файл удалён в обход кэша — промах; созданный каталог не оставляем
+                self._drop_disk(key)
+                if target is not None:
+                    shutil.rmtree(target.parent, ignore_errors=True)
+                report_pdf_cache_total.labels(tier="disk", result="miss").inc()
+                return None
+        report_pdf_cache_total.labels(tier="disk", result="hit").inc()
+        return target
+
+    def put(self, key: str, record: RecordKey, data: bytes) -> None:
+        with self._lock:
+            self._records.setdefault(record, set()).add(key)
+            self._put_memory(key, data)
+        if self._disk_dir is not None and len(data) <= self._disk_max_bytes:
+            self._write_disk(key, record, len(data), lambda target: target.write_bytes(data))
+
+    def put_file(self, key: str, record: RecordKey, path: Path) -> None:
+        """Сохранить готовый PDF-файл: на диск — копией; в память — если уровень его вмещает."""
+        size = path.stat().st_size
+        with self._lock:
+            self._records.setdefault(record, set()).add(key)
+        if self._max_entries > 0 and size <= self._max_bytes:
+            data = path.read_bytes()
+            with self._lock:
+                self._put_memory(key, data)
+        if self._disk_dir is not None and size <= self._disk_max_bytes:
+            self._write_disk(key, record, size, lambda target: shutil.copyfile(path, target))
+
+    def invalidate(self, student_id: int, year: int, month: int) -> None:
+        """Удалить все PDF по записи занятия (после её изменения)."""
+        with self._lock:
+            keys = self._records.pop((student_id, year, month), set())
+            for key in keys:
+                data = self._memory.pop(key, None)
+                if data is not None:
+                    self._memory_bytes -= len(data)
+                self._drop_disk(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._records.clear()
+            for key in list(self._disk):
+                self._drop_disk(key)
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self._max_bytes or self._max_entries <= 0:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while len(self._memory) > self._max_entries or self._memory_bytes > self._max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _disk_path(self, key: str, record: RecordKey) -> Path:
+        student_id, year, month = record
+        return self._disk_dir / f"{student_id}_{year}_{month}_{key}.pdf"
+
+    def _write_disk(self, key: str, record: RecordKey, size: int, write: Callable[[Path], object]) -> None:
+        path = self._disk_path(key, record)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning("Cannot write PDF cache file", path=str(path), error=str(e))
+            tmp_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_bytes -= old.size
+                if old.record != record:
+                    self._disk_path(key, old.record).unlink(missing_ok=True)
+            self._disk[key] = _DiskFile(size, record)
+            self._disk_bytes += size
+            while self._disk_bytes > self._disk_max_bytes and self._disk:
+                self._drop_disk(next(iter(self._disk)))
+
+    def _drop_disk(self, key: str) -> None:
+        """Удалить файл из дискового уровня (вызывается под self._lock)."""
+        if self._disk_dir is None or key not in self._disk:
+            return
+        entry = self._disk.pop(key)
+        self._disk_bytes -= entry.size
+        self._disk_path(key, entry.record).unlink(missing_ok=True)
+
+    def _load_disk_index(self) -> None:
+        """
+        Подхватить файлы, оставшиеся от прошлого запуска (старые — первыми на вытеснение),
+        с записями из имён файлов. Файлы без записи в имени удаляются — их не сбросить.
+        """
+        self._disk_dir.mkdir(parents=True, exist_ok=True)
+        files = sorted(self._disk_dir.glob("*.pdf"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            parsed = _parse_disk_name(path.stem)
+            if parsed is None or parsed[0] in self._disk:
+                path.unlink(missing_ok=True)
+                continue
+            key, record = parsed
+            size = path.stat().st_size
+            self._disk[key] = _DiskFile(size, record)
+            self._records.setdefault(record, set()).add(key)
+            self._disk_bytes += size
+        while self._disk_bytes > self._disk_max_bytes and self._disk:
+            self._drop_disk(next(iter(self._disk)))
+
+
+def _link_or_copy(path: Path, target: Path) -> None:
+    try:
+        os.link(path, target)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        # Другая файловая система или жёсткие ссылки не поддерживаются
+        shutil.copyfile(path, target)
+
+
+def _parse_disk_name(stem: str) -> tuple[str, RecordKey] | None:
+    """«{student_id}_{year}_{month}_{ключ}» -> (ключ, запись); None — имя другого формата."""
+    parts = stem.split("_")
+    if len(parts) != 4:
+        return None
+    try:
+        student_id, year, month = (int(part) for part in parts[:3])
+    except ValueError:
+        return None
+    return parts[3], (student_id, year, month)
+
+
+_cache: PdfCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_cache() -> PdfCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = get_settings()
+                disk_dir = None
+                if settings.report_cache_disk_enabled:
+                    disk_dir = Path(settings.temp_dir or "/tmp") / "report_cache"
+                _cache = PdfCache(
+                    max_entries=settings.report_cache_max_entries,
+                    max_bytes=settings.report_cache_max_bytes,
+                    disk_dir=disk_dir,
+                    disk_max_bytes=settings.report_cache_disk_max_bytes,
+                )
+    return _cache
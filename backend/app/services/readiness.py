@@ -0,0 +1,159 @@
+"""
+Готовность сервиса (GET /readyz) без I/O в обработчике пробы.
+
+Фоновая задача раз в readiness_interval секунд проверяет БД (SELECT 1 с таймаутом
+readiness_db_timeout) и конвейер отчётов (шаблон на месте, пул конвертеров жив) и
+сохраняет результат; проба только читает его. Результат старше трёх интервалов
+считается недействительным — задача зависла, сервис не готов.
+
+Конвейер отчётов: если выбранный движок недоступен, но включён fallback на native,
+сервис готов со статусом degraded (отчёты формируются встроенным движком).
+
+Реплика (если настроена) проверяется тем же запросом, но на готовность не влияет —
+чтения уходят на основную БД; результат проверки включает и выключает реплику
+для чтения (app/db_routing.py).
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import get_settings
+from app.database import get_async_engine, get_replica_engine
+from app.db_routing import mark_replica_down, mark_replica_up
+from app.services.converter import get_converter_pool
+from app.services.renderers import RENDERERS
+from app.services.template import get_template_path
+
+log = structlog.get_logger()
+
+
+@dataclass
+class ReadinessState:
+    checked_at: float | None = None
+    database: str = "unknown"
+    database_error: str | None = None
+    database_ms: float | None = None
+    replica: str = "disabled"
+    replica_error: str | None = None
+    report: str = "unknown"
+    report_details: dict = field(default_factory=dict)
+
+
+_state = ReadinessState()
+_task: asyncio.Task | None = None
+
+
+async def _check_database(engine: AsyncEngine, timeout: float) -> tuple[str, str | None, float]:
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(timeout):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        return "ok", None, time.perf_counter() - start
+    except TimeoutError:
+        return "error", f"timeout after {timeout}s", time.perf_counter() - start
+    except Exception as e:
+        return "error", str(e).replace("\n", " ").strip() or type(e).__name__, time.perf_counter() - start
+
+
+def _check_report_pipeline() -> tuple[str, dict]:
+    """ok — выбранный движок доступен; degraded — работает fallback; error — отчёты недоступны."""
+    settings = get_settings()
+    pool = get_converter_pool()
+    details = {
+        "engine": settings.report_engine,
+        "template": get_template_path().exists(),
+        "converter_pool": "disabled" if pool is None else ("ok" if pool.healthy() else "error"),
+    }
+    renderer = RENDERERS.get(settings.report_engine)
+    if renderer is not None and renderer.available() and details["converter_pool"] != "error":
+        return "ok", details
+    if settings.report_engine_fallback:
+        return "degraded", details
+    return "error", details
+
+
+async def refresh_readiness() -> ReadinessState:
+    settings = get_settings()
+    database, error, duration = await _check_database(get_async_engine(), settings.readiness_db_timeout)
+    replica, replica_error = "disabled", None
+    replica_engine = get_replica_engine()
+    if replica_engine is not None:
+        replica, replica_error, _ = await _check_database(replica_engine, settings.readiness_db_timeout)
+        if replica == "ok":
+            mark_replica_up()
+        else:
+            mark_replica_down(RuntimeError(replica_error))
+    report, details = await asyncio.to_thread(_check_report_pipeline)
+    global _state
+    previous = _state
+    _state = ReadinessState(
+        checked_at=time.monotonic(),
+        database=database,
+        database_error=error,
+        database_ms=round(duration * 1000, 2),
+        replica=replica,
+        replica_error=replica_error,
+        report=report,
+        report_details=details,
+    )
+    if (previous.database, previous.replica, previous.report) != (database, replica, report):
+        log.info("Readiness changed", database=database, replica=replica, report=report, error=error)
+    return _state
+
+
+async def _loop(interval: float) -> None:
+    while True:
+        try:
+            await refresh_readiness()
+        except Exception as e:
+            log.error("Readiness check failed", error=str(e))
+        await asyncio.sleep(interval)
+
+
+def get_readiness() -> tuple[bool, dict]:
+    """Готов ли сервис и тело ответа пробы (из последней фоновой проверки)."""
+    state = _state
+    max_age = get_settings().readiness_interval * 3
+    age = None if state.checked_at is None else time.monotonic() - state.checked_at
+    stale = age is None or age > max_age
+    ready = not stale and state.database == "ok" and state.report != "error"
+    if not ready:
+        status = "not_ready"
+    elif state.report == "degraded":
+        status = "degraded"
+    else:
+        status = "ok"
+    return ready, {
+        "status": status,
+        "checked_seconds_ago": None if age is None else round(age, 1),
+        "database": state.database if not stale else "stale",
+        "database_error": state.database_error,
+        "database_ms": state.database_ms,
+        "replica": state.replica,
+        "replica_error": state.replica_error,
+        "report": state.report,
+        "report_details": state.report_details,
+    }
+
+
+def start_readiness() -> None:
+    """Запустить фоновую проверку (вызывается в lifespan приложения)."""
+    global _task
+    _task = asyncio.create_task(_loop(get_settings().readiness_interval), name="readiness")
+
+
+async def stop_readiness() -> None:
+    global _task
+    task, _task = _task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
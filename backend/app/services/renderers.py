@@ -0,0 +1,98 @@
+"""
+Движки формирования PDF-отчёта.
+
+- libreoffice — шаблон .docx + конвертация LibreOffice: точное соответствие шаблону;
+- native — встроенный генератор (app/services/native_pdf.py): миллисекунды, без процессов.
+
+Движок выбирается параметром запроса или настройкой report_engine. Если выбран
+LibreOffice, но он недоступен (нет шаблона или конвертера), при report_engine_fallback
+используется native — вместо ошибки 500.
+"""
+
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from app.config import get_settings
+from app.services.converter import get_converter_pool
+from app.services.native_pdf import LAYOUT_VERSION, render_native_pdf
+from app.services.pdf_cache import make_cache_key
+from app.services.report import render_context_to_pdf, render_context_to_pdf_file
+from app.services.report_timing import report_stage
+from app.services.template import get_compiled_template, get_template_path
+
+
+class ReportRenderer(ABC):
+    """Движок: PDF из контекста get_report_context()."""
+
+    name: str
+
+    @abstractmethod
+    def version(self) -> str:
+        """Версия вёрстки (шаблона) — входит в ключ кэша PDF."""
+
+    @abstractmethod
+    def render(self, context: dict) -> bytes:
+        """Содержимое PDF-файла."""
+
+    def render_to_file(self, context: dict, out_dir: Path) -> Path:
+        """PDF файлом в out_dir (ответ отдаётся с диска, без копии в памяти процесса)."""
+        path = out_dir / "report.pdf"
+        path.write_bytes(self.render(context))
+        return path
+
+    def available(self) -> bool:
+        return True
+
+    def cache_key(self, context: dict) -> str:
+        return make_cache_key(context, f"{self.name}:{self.version()}")
+
+
+class LibreOfficeRenderer(ReportRenderer):
+    name = "libreoffice"
+
+    def version(self) -> str:
+        return get_compiled_template().version
+
+    def render(self, context: dict) -> bytes:
+        return render_context_to_pdf(context)
+
+    def render_to_file(self, context: dict, out_dir: Path) -> Path:
+        return render_context_to_pdf_file(context, out_dir)
+
+    def available(self) -> bool:
+        if not get_template_path().exists():
+            return False
+        return get_converter_pool() is not None or shutil.which(get_settings().libreoffice_binary) is not None
+
+
+class NativeRenderer(ReportRenderer):
+    name = "native"
+
+    def version(self) -> str:
+        return LAYOUT_VERSION
+
+    def render(self, context: dict) -> bytes:
+        with report_stage("native_render"):
+            return render_native_pdf(context)
+
+
+RENDERERS: dict[str, ReportRenderer] = {
+    renderer.name: renderer for renderer in (LibreOfficeRenderer(), NativeRenderer())
+}
+
+
+def get_renderer(engine: str | None = None) -> ReportRenderer:
+    """
+    Движок по имени (или из настроек) с учётом fallback на native.
+    ValueError — неизвестное имя движка.
+    """
+    settings = get_settings()
+    name = engine or settings.report_engine
+    try:
+        renderer = RENDERERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown report engine: {name}") from None
+    if settings.report_engine_fallback and not renderer.available():
+        return RENDERERS[NativeRenderer.name]
+    return renderer
@@ -1,6 +1,7 @@
 """
 Генерация PDF-отчёта на основе шаблона .docx с подстановкой данных из БД.
-В контейнере используется LibreOffice для конвертации docx -> pdf.
+В контейнере используется LibreOffice для конвертации docx -> pdf
+(пул долгоживущих воркеров, см. app/services/converter.py).
 Подстановка плейсхолдеров [[ имя ]] — простая замена без Jinja2, чтобы символы
 «<», «{» и т.п. в документе Word не вызывали ошибки парсера.
 """
@@ -9,13 +10,23 @@ import re
 import subprocess
 import tempfile
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from docx import Document
+import structlog
 
 from app.config import get_settings
+from app.services.converter import ConverterError, get_converter_pool
+from app.services.report_timing import report_stage
+from app.services.template import (
+    PLACEHOLDER_PATTERN,
+    get_compiled_template,
+    iter_placeholder_paragraphs,
+)
 
-# Плейсхолдеры в шаблоне: [[ имя_переменной ]]
-PLACEHOLDER_PATTERN = re.compile(r"\[\[\s*(\w+)\s*\]\]")
+if TYPE_CHECKING:
+    from docx.document import Document
+
+log = structlog.get_logger()
 
 # Названия месяцев на русском; индекс 1–12 = январь–декабрь
 MONTHS_RU = [
@@ -73,32 +84,41 @@ def _replace_placeholders(text: str, context: dict) -> str:
     return PLACEHOLDER_PATTERN.sub(repl, text)
 
 
-def _render_docx_with_context(doc: Document, context: dict) -> None:
+def _render_docx_with_context(doc: "Document", context: dict) -> None:
     """Подставить context во все параграфы и ячейки таблиц (изменяет doc)."""
-    for para in doc.paragraphs:
-        if PLACEHOLDER_PATTERN.search(para.text):
+    for para in iter_placeholder_paragraphs(doc):
+        para.text = _replace_placeholders(para.text, context)
+
+
+def _render_compiled_template(context: dict) -> "Document":
+    """Копия шаблона из кэша с подстановкой context только в места плейсхолдеров."""
+    with report_stage("template_load"):
+        template = get_compiled_template()
+        doc = template.new_document()
+    with report_stage("fill"):
+        for para in template.placeholder_paragraphs(doc):
             para.text = _replace_placeholders(para.text, context)
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for para in cell.paragraphs:
-                    if PLACEHOLDER_PATTERN.search(para.text):
-                        para.text = _replace_placeholders(para.text, context)
-    for section in doc.sections:
-        try:
-            if section.header is not None:
-                for para in section.header.paragraphs:
-                    if PLACEHOLDER_PATTERN.search(para.text):
-                        para.text = _replace_placeholders(para.text, context)
-        except Exception:
-            pass
-        try:
-            if section.footer is not None:
-                for para in section.footer.paragraphs:
-                    if PLACEHOLDER_PATTERN.search(para.text):
-                        para.text = _replace_placeholders(para.text, context)
-        except Exception:
-            pass
+    return doc
+
+
+def write_report_docx(context: dict, docx_path: Path) -> None:
+    """
+    Заполненный шаблон в файл .docx. По умолчанию (report_template_engine=ooxml) —
+    прямой записью XML; docx — через объектную модель python-docx.
+    """
+    if get_settings().report_template_engine == "docx":
+        doc = _render_compiled_template(context)
+        with report_stage("docx_save"):
+            doc.save(str(docx_path))  # python-docx Document.save()
+        return
+
+    with report_stage("template_load"):
+        template = get_compiled_template().ooxml
+    with report_stage("fill"):
+        rendered = template.render_parts(context)
+    with report_stage("docx_save"):
+        with open(docx_path, "w+b") as f:
+            template.write(rendered, f)
 
 
 def render_docx_and_convert_to_pdf(record) -> bytes:
@@ -106,60 +126,89 @@ def render_docx_and_convert_to_pdf(record) -> bytes:
     Заполнить шаблон .docx данными записи и сконвертировать в PDF.
     Возвращает содержимое PDF-файла.
     """
-    settings = get_settings()
-    base_dir = Path(__file__).resolve().parent.parent.parent
-    templates_dir = base_dir / settings.templates_dir
-    template_path = templates_dir / settings.report_template_name
+    return render_context_to_pdf(get_report_context(record))
 
-    if not template_path.exists():
-        raise FileNotFoundError(f"Report template not found: {template_path}")
 
-    doc = Document(str(template_path))
-    context = get_report_context(record)
-    _render_docx_with_context(doc, context)
+def render_context_to_pdf(context: dict) -> bytes:
+    """Заполнить шаблон готовым контекстом (см. get_report_context) и сконвертировать в PDF."""
+    with tempfile.TemporaryDirectory(prefix="report_", dir=_tmpdir_parent()) as tmpdir:
+        pdf_path = render_context_to_pdf_file(context, Path(tmpdir))
+        with report_stage("pdf_read"):
+            return pdf_path.read_bytes()
 
-    tmpdir_parent = None
+
+def render_context_to_pdf_file(context: dict, out_dir: Path) -> Path:
+    """
+    То же, но PDF остаётся файлом в out_dir (вместе с .docx) — ответ отдаётся с диска.
+    Каталог удаляет вызывающий код.
+    """
+    docx_path = out_dir / "report.docx"
+    write_report_docx(context, docx_path)
+
+    # Конвертация в PDF через LibreOffice (в Docker) или локально
+    with report_stage("convert"):
+        pdf_path = _convert_docx_to_pdf(docx_path, out_dir)
+
+    if not pdf_path or not pdf_path.exists():
+        raise RuntimeError("PDF conversion failed")
+    return pdf_path
+
+
+def new_report_dir() -> Path:
+    """Временный каталог для файлов одного отчёта (удаляет вызывающий код)."""
+    return Path(tempfile.mkdtemp(prefix="report_", dir=_tmpdir_parent()))
+
+
+def _tmpdir_parent() -> str | None:
+    """Каталог для временных файлов отчёта (settings.temp_dir, если он существует)."""
+    settings = get_settings()
     if settings.temp_dir:
         p = Path(settings.temp_dir)
         if p.exists() and p.is_dir():
-            tmpdir_parent = str(p)
-    with tempfile.TemporaryDirectory(prefix="report_", dir=tmpdir_parent) as tmpdir:
-        tmpdir_path = Path(tmpdir)
-        docx_path = tmpdir_path / "report.docx"
-        doc.save(str(docx_path))  # python-docx Document.save()
+            return str(p)
+    return None
 
-        # Конвертация в PDF через LibreOffice (в Docker) или локально
-        pdf_path = _convert_docx_to_pdf(docx_path, tmpdir_path)
 
-        if not pdf_path or not pdf_path.exists():
-            raise RuntimeError("PDF conversion failed")
-
-        return pdf_path.read_bytes()
+def _convert_docx_to_pdf(docx_path: Path, out_dir: Path) -> Path | None:
+    """Конвертация одного .docx в .pdf (см. _convert_docx_batch)."""
+    _convert_docx_batch([docx_path], out_dir)
+    pdf_path = out_dir / f"{docx_path.stem}.pdf"
+    return pdf_path if pdf_path.exists() else None
 
 
-def _convert_docx_to_pdf(docx_path: Path, out_dir: Path) -> Path | None:
+def _convert_docx_batch(docx_paths: list[Path], out_dir: Path) -> None:
     """
-    Конвертация .docx в .pdf с помощью LibreOffice (headless).
-    В контейнере должен быть установлен: apt-get install -y libreoffice-writer
+    Конвертация списка .docx в .pdf (в out_dir, имена по исходным файлам) одним вызовом
+    LibreOffice (headless). Если запущен пул конвертеров — на свободном долгоживущем
+    воркере, иначе (или если воркер упал) — отдельным процессом LibreOffice.
+    Отсутствующий после вызова .pdf означает ошибку конвертации этого файла.
+    В контейнере должен быть установлен: apt-get install -y libreoffice-writer python3-uno
     """
+    pool = get_converter_pool()
+    if pool is not None:
+        try:
+            pool.convert(docx_paths, out_dir)
+            return
+        except ConverterError as e:
+            log.warning("Converter pool failed, falling back to one-shot LibreOffice", error=str(e))
+
+    settings = get_settings()
     try:
         subprocess.run(
             [
-                "libreoffice",
+                settings.libreoffice_binary,
                 "--headless",
                 "--convert-to",
                 "pdf",
                 "--outdir",
                 str(out_dir),
-                str(docx_path),
+                *(str(p) for p in docx_paths),
             ],
             check=True,
             capture_output=True,
-            timeout=60,
+            timeout=settings.converter_timeout * max(len(docx_paths), 1),
         )
-        pdf_path = out_dir / "report.pdf"
-        return pdf_path if pdf_path.exists() else None
     except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-        # Fallback: если LibreOffice нет (локальная разработка), возвращаем пустой PDF
-        # или можно генерировать простой PDF через reportlab
-        return None
+        # Fallback: если LibreOffice нет (локальная разработка), PDF не появится —
+        # вызывающий код сообщит об ошибке конвертации
+        pass
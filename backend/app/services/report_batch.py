@@ -0,0 +1,164 @@
+"""
+Пакетная выгрузка отчётов за месяц одним ZIP-архивом.
+
+Документы заполняются пачками по report_batch_size и конвертируются одним вызовом
+конвертера на пачку. Готовые PDF сразу дописываются в архив, а архив отдаётся
+клиенту частями по мере записи — целиком в памяти он не собирается.
+Уже закэшированные PDF (см. pdf_cache) повторно не конвертируются.
+Для встроенного движка (native) конвертация не нужна — PDF строятся по одному.
+Каждая конвертация (пачка или native-отчёт) занимает слот допуска (app/services/admission.py);
+не дождавшиеся слота отчёты перечисляются в errors.txt.
+"""
+
+import io
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import structlog
+
+from app.config import get_settings
+from app.metrics import reports_generated_total
+from app.services.admission import AdmissionRejected, get_report_admission
+from app.services.pdf_cache import get_pdf_cache
+from app.services.renderers import LibreOfficeRenderer, ReportRenderer
+from app.services.report import (
+    _convert_docx_batch,
+    _tmpdir_parent,
+    get_report_context,
+    write_report_docx,
+)
+
+log = structlog.get_logger()
+
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class BatchItem:
+    """Один отчёт архива: имя файла, запись занятия и контекст подстановки."""
+
+    name: str
+    student_id: int
+    year: int
+    month: int
+    context: dict
+    cache_key: str
+
+
+def build_batch_items(records, renderer: ReportRenderer) -> list[BatchItem]:
+    """Подготовить контексты (без обращений к БД после этого шага)."""
+    items = []
+    for record in records:
+        context = get_report_context(record)
+        items.append(
+            BatchItem(
+                name=f"report_{record.student_id}_{record.year}_{record.month:02d}",
+                student_id=record.student_id,
+                year=record.year,
+                month=record.month,
+                context=context,
+                cache_key=renderer.cache_key(context),
+            )
+        )
+    return items
+
+
+class _ZipSink(io.RawIOBase):
+    """Поток без seek() для zipfile: копит записанные байты до очередного drain()."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_reports_zip(items: list[BatchItem], renderer: ReportRenderer) -> Iterator[bytes]:
+    """Генератор байтов ZIP-архива с PDF-отчётами по items."""
+    for chunk in _iter_zip_chunks(items, renderer):
+        if chunk:
+            yield chunk
+
+
+def _iter_zip_chunks(items: list[BatchItem], renderer: ReportRenderer) -> Iterator[bytes]:
+    settings = get_settings()
+    batch_size = max(settings.report_batch_size, 1)
+    cache = get_pdf_cache()
+    admission = get_report_admission()
+    errors: list[str] = []
+
+    sink = _ZipSink()
+    # PDF уже сжаты — минимальный уровень сжатия экономит CPU
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        with tempfile.TemporaryDirectory(prefix="report_batch_", dir=_tmpdir_parent()) as tmpdir:
+            tmpdir_path = Path(tmpdir)
+            for start in range(0, len(items), batch_size):
+                pending: list[BatchItem] = []
+                for item in items[start:start + batch_size]:
+                    pdf_bytes = cache.get(item.cache_key)
+                    if pdf_bytes is None and renderer.name != LibreOfficeRenderer.name:
+                        try:
+                            with admission.blocking_slot():
+                                pdf_bytes = renderer.render(item.context)
+                        except Exception as e:
+                            errors.append(f"{item.name}.pdf: {e}")
+                            continue
+                        cache.put(item.cache_key, (item.student_id, item.year, item.month), pdf_bytes)
+                        reports_generated_total.inc()
+                    if pdf_bytes is not None:
+                        zf.writestr(f"{item.name}.pdf", pdf_bytes)
+                        yield sink.drain()
+                    else:
+                        pending.append(item)
+                if not pending:
+                    continue
+
+                docx_paths = []
+                for item in pending:
+                    docx_path = tmpdir_path / f"{item.name}.docx"
+                    write_report_docx(item.context, docx_path)
+                    docx_paths.append(docx_path)
+                failure = "PDF conversion failed"
+                try:
+                    with admission.blocking_slot():
+                        _convert_docx_batch(docx_paths, tmpdir_path)
+                except AdmissionRejected as e:
+                    failure = str(e)
+                except RuntimeError as e:
+                    log.warning("Batch report conversion failed", error=str(e))
+
+                for item, docx_path in zip(pending, docx_paths):
+                    docx_path.unlink(missing_ok=True)
+                    pdf_path = tmpdir_path / f"{item.name}.pdf"
+                    if not pdf_path.exists():
+                        errors.append(f"{item.name}.pdf: {failure}")
+                        continue
+                    with pdf_path.open("rb") as src, zf.open(f"{item.name}.pdf", "w") as dest:
+                        while chunk := src.read(CHUNK_SIZE):
+                            dest.write(chunk)
+                            yield sink.drain()
+                    cache.put(
+                        item.cache_key,
+                        (item.student_id, item.year, item.month),
+                        pdf_path.read_bytes(),
+                    )
+                    pdf_path.unlink()
+                    reports_generated_total.inc()
+                    yield sink.drain()
+
+        if errors:
+            zf.writestr("errors.txt", "\n".join(errors) + "\n")
+    # Центральный каталог архива пишется при закрытии ZipFile
+    yield sink.drain()
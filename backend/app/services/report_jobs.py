@@ -0,0 +1,193 @@
+"""
+Асинхронная очередь заданий на формирование PDF-отчётов.
+
+POST создаёт задание и сразу возвращает его id; отчёт формируется в ограниченном
+пуле исполнителей (report_job_workers), без сессии БД — контекст подстановки
+собирается в обработчике запроса до постановки в очередь. Готовый PDF пишется
+в temp_dir/report_jobs и хранится report_job_ttl секунд после завершения.
+"""
+
+import enum
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import structlog
+
+from app.config import get_settings
+from app.metrics import (
+    report_job_duration_seconds,
+    report_jobs_queue_depth,
+    report_jobs_total,
+    reports_generated_total,
+)
+from app.services.admission import get_report_admission
+from app.services.pdf_cache import get_pdf_cache
+from app.services.renderers import ReportRenderer
+
+log = structlog.get_logger()
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class ReportJobQueueFull(RuntimeError):
+    """В очереди уже report_job_queue_depth заданий."""
+
+
+@dataclass
+class ReportJob:
+    id: str
+    student_id: int
+    year: int
+    month: int
+    status: JobStatus
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+    pdf_path: Path | None = None
+
+
+class ReportJobManager:
+    """Хранилище заданий и пул исполнителей."""
+
+    def __init__(self, workers: int, queue_depth: int, ttl: float, result_dir: Path):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-job")
+        self._queue_depth = queue_depth
+        self._ttl = ttl
+        self._result_dir = result_dir
+        self._result_dir.mkdir(parents=True, exist_ok=True)
+        self._jobs: dict[str, ReportJob] = {}
+        self._queued = 0
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        student_id: int,
+        year: int,
+        month: int,
+        context: dict,
+        renderer: ReportRenderer,
+    ) -> ReportJob:
+        self._expire()
+        job = ReportJob(
+            id=uuid.uuid4().hex,
+            student_id=student_id,
+            year=year,
+            month=month,
+            status=JobStatus.queued,
+            created_at=time.time(),
+        )
+        with self._lock:
+            if self._queued >= self._queue_depth:
+                raise ReportJobQueueFull("Report job queue is full")
+            self._queued += 1
+            self._jobs[job.id] = job
+            report_jobs_queue_depth.set(self._queued)
+        self._executor.submit(self._run, job, context, renderer)
+        return job
+
+    def get(self, job_id: str) -> ReportJob | None:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for job in list(self._jobs.values()):
+            if job.pdf_path is not None:
+                job.pdf_path.unlink(missing_ok=True)
+        self._jobs.clear()
+        report_jobs_queue_depth.set(0)
+
+    def _run(self, job: ReportJob, context: dict, renderer: ReportRenderer) -> None:
+        with self._lock:
+            self._queued -= 1
+            report_jobs_queue_depth.set(self._queued)
+        job.started_at = time.time()
+        job.status = JobStatus.running
+        report_job_duration_seconds.labels(phase="wait").observe(job.started_at - job.created_at)
+        try:
+            cache = get_pdf_cache()
+            cache_key = renderer.cache_key(context)
+            cached = cache.lookup(
+                cache_key, lambda: Path(tempfile.mkdtemp(prefix=f"job_{job.id}_", dir=self._result_dir))
+            )
+            pdf_path = self._result_dir / f"{job.id}.pdf"
+            if isinstance(cached, bytes):
+                pdf_path.write_bytes(cached)
+            elif cached is not None:
+                # Ссылка на файл кэша — переносится в результаты без копирования
+                os.replace(cached, pdf_path)
+                shutil.rmtree(cached.parent, ignore_errors=True)
+            else:
+                # PDF формируется файлом и переносится в результаты без чтения в память;
+                # слот допуска общий с HTTP-запросами (предел одновременных конвертаций)
+                with tempfile.TemporaryDirectory(prefix=f"job_{job.id}_", dir=self._result_dir) as tmpdir:
+                    with get_report_admission().blocking_slot():
+                        rendered = renderer.render_to_file(context, Path(tmpdir))
+                    cache.put_file(cache_key, (job.student_id, job.year, job.month), rendered)
+                    os.replace(rendered, pdf_path)
+                reports_generated_total.inc()
+            job.pdf_path = pdf_path
+            job.status = JobStatus.done
+        except Exception as e:
+            job.error = str(e).replace("\n", " ").strip() or type(e).__name__
+            job.status = JobStatus.failed
+            log.warning("Report job failed", job_id=job.id, error=job.error)
+        finally:
+            job.finished_at = time.time()
+            report_job_duration_seconds.labels(phase="run").observe(job.finished_at - job.started_at)
+            report_job_duration_seconds.labels(phase="total").observe(job.finished_at - job.created_at)
+            report_jobs_total.labels(status=job.status.value).inc()
+
+    def _expire(self) -> None:
+        """Удалить завершённые задания старше ttl вместе с их PDF."""
+        deadline = time.time() - self._ttl
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.finished_at is not None and job.finished_at < deadline
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            if job.pdf_path is not None:
+                job.pdf_path.unlink(missing_ok=True)
+
+
+_manager: ReportJobManager | None = None
+
+
+def get_report_jobs() -> ReportJobManager | None:
+    return _manager
+
+
+def start_report_jobs() -> ReportJobManager:
+    """Запустить пул исполнителей заданий (вызывается в lifespan приложения)."""
+    global _manager
+    settings = get_settings()
+    _manager = ReportJobManager(
+        workers=max(settings.report_job_workers, 1),
+        queue_depth=settings.report_job_queue_depth,
+        ttl=settings.report_job_ttl,
+        result_dir=Path(settings.temp_dir or "/tmp") / "report_jobs",
+    )
+    return _manager
+
+
+def stop_report_jobs() -> None:
+    global _manager
+    manager, _manager = _manager, None
+    if manager is not None:
+        manager.shutdown()
@@ -0,0 +1,64 @@
+"""
+Время этапов формирования отчёта: метрика, заголовок Server-Timing и строка лога.
+
+Обработчик создаёт StageTimer (start_report_timer); этапы в глубине конвейера
+(render_context_to_pdf и т.д.) отмечаются report_stage() и попадают в текущий таймер
+через contextvar — он переносится и в пул потоков (run_in_threadpool). Без таймера
+(задания, пакетная выгрузка) этапы только пишутся в гистограмму.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Generator
+
+from app.metrics import report_stage_duration_seconds
+
+
+class StageTimer:
+    """Длительности этапов одного отчёта (сек); повторный этап суммируется."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing (мс), последним — total."""
+        parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(parts)
+
+    def as_log(self) -> dict:
+        return {
+            "stages_ms": {stage: round(seconds * 1000, 2) for stage, seconds in self.stages.items()},
+            "total_ms": round(self.total() * 1000, 2),
+        }
+
+
+_current: ContextVar[StageTimer | None] = ContextVar("report_stage_timer", default=None)
+
+
+def start_report_timer() -> StageTimer:
+    timer = StageTimer()
+    _current.set(timer)
+    return timer
+
+
+@contextmanager
+def report_stage(stage: str) -> Generator[None, None, None]:
+    """Замерить этап: в гистограмму и в таймер текущего запроса (если есть)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        report_stage_duration_seconds.labels(stage=stage).observe(elapsed)
+        timer = _current.get()
+        if timer is not None:
+            timer.add(stage, elapsed)
@@ -0,0 +1,110 @@
+"""
+Кэш сериализованного списка студентов (GET /api/students).
+
+Список ограничен student_list_max_rows строками; если студентов больше, курсор
+продолжения (как у постраничного списка) хранится вместе с телом.
+
+Список меняется редко, поэтому готовые тела ответа (JSON и MessagePack) и их ETag
+хранятся в памяти процесса и сбрасываются при создании студента. student_list_cache_ttl ограничивает
+устаревание между репликами (сброс виден только в своём процессе).
+"""
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+
+import msgpack
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.http_serialization import row_serializer
+from app.metrics import student_list_cache_total
+from app.models import Student
+from app.services.students import encode_cursor
+from app.schemas import StudentResponse
+
+_student_row = row_serializer(StudentResponse)
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+@dataclass(frozen=True)
+class CachedStudentList:
+    body: bytes
+    etag: str
+    msgpack_body: bytes
+    msgpack_etag: str
+    created_at: float
+    next_cursor: str | None = None  # список обрезан по student_list_max_rows
+
+    def representation(self, as_msgpack: bool) -> tuple[bytes, str]:
+        """(тело, ETag) в нужном формате — у каждого формата свой ETag."""
+        return (self.msgpack_body, self.msgpack_etag) if as_msgpack else (self.body, self.etag)
+
+
+_cached: CachedStudentList | None = None
+_generation = 0
+_lock = threading.Lock()
+
+
+def cached_student_list() -> CachedStudentList | None:
+    """Список из кэша, если он есть и не устарел по student_list_cache_ttl."""
+    cached = _cached
+    ttl = get_settings().student_list_cache_ttl
+    if cached is not None and (ttl <= 0 or time.monotonic() - cached.created_at < ttl):
+        student_list_cache_total.labels(result="hit").inc()
+        return cached
+    return None
+
+
+def get_student_list(db: Session) -> CachedStudentList:
+    """
+    Список студентов (по фамилии и имени) в JSON и MessagePack со strong ETag.
+    Заполнять кэш — только сессией основной БД: реплика может ещё не видеть
+    запись, после которой кэш сброшен.
+    """
+    global _cached
+    cached = cached_student_list()
+    if cached is not None:
+        return cached
+
+    student_list_cache_total.labels(result="miss").inc()
+    settings = get_settings()
+    with _lock:
+        generation = _generation
+    max_rows = max(settings.student_list_max_rows, 1)
+    students = db.scalars(
+        select(Student).order_by(Student.last_name, Student.first_name, Student.id).limit(max_rows + 1)
+    ).all()
+    next_cursor = None
+    if len(students) > max_rows:
+        students = students[:max_rows]
+        next_cursor = encode_cursor(students[-1])
+    rows = [_student_row(student) for student in students]
+    body = orjson.dumps(rows)
+    msgpack_body = msgpack.packb(rows, use_bin_type=True)
+    cached = CachedStudentList(
+        body=body,
+        etag=_etag(body),
+        msgpack_body=msgpack_body,
+        msgpack_etag=_etag(msgpack_body),
+        created_at=time.monotonic(),
+        next_cursor=next_cursor,
+    )
+    with _lock:
+        # Сброс после начала запроса — результат мог устареть, не сохраняем
+        if generation == _generation:
+            _cached = cached
+    return cached
+
+
+def invalidate_student_list() -> None:
+    global _cached, _generation
+    with _lock:
+        _generation += 1
+        _cached = None
@@ -0,0 +1,79 @@
+"""
+Постраничный список студентов (keyset) и поиск по началу имени.
+
+Порядок — (last_name, first_name, id), индекс ix_students_last_first_id. Курсор —
+ключ последней строки страницы (base64url от JSON): следующая страница читается
+условием (last_name, first_name, id) > курсор по индексу, без OFFSET. Условие
+раскрыто в OR/AND с избыточным last_name >= … : сравнение кортежей MySQL не
+превращает в диапазон по индексу и читает страницу сканом с начала.
+Поиск q — префикс (LIKE 'q%') по имени и фамилии на русском и на иврите;
+у каждой из колонок есть индекс, поэтому это диапазон по индексу, а не полный скан.
+"""
+
+import base64
+import binascii
+import json
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Student
+
+SEARCH_COLUMNS = (Student.last_name, Student.first_name, Student.last_name_he, Student.first_name_he)
+
+
+def encode_cursor(student: Student) -> str:
+    key = [student.last_name, student.first_name, student.id]
+    raw = json.dumps(key, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str, int]:
+    """ValueError — курсор повреждён."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_name, first_name, student_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+    if not (isinstance(last_name, str) and isinstance(first_name, str) and isinstance(student_id, int)):
+        raise ValueError("Invalid cursor")
+    return last_name, first_name, student_id
+
+
+def after_cursor(cursor: str):
+    """Условие «строка после курсора» в порядке (last_name, first_name, id). ValueError — курсор повреждён."""
+    last_name, first_name, student_id = decode_cursor(cursor)
+    return and_(
+        Student.last_name >= last_name,  # граница диапазона по ix_students_last_first_id
+        or_(
+            Student.last_name > last_name,
+            and_(Student.last_name == last_name, Student.first_name > first_name),
+            and_(Student.last_name == last_name, Student.first_name == first_name, Student.id > student_id),
+        ),
+    )
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def list_students_page(
+    db: Session,
+    limit: int,
+    cursor: str | None = None,
+    q: str | None = None,
+) -> tuple[list[Student], str | None]:
+    """Страница студентов и курсор следующей (None — страница последняя)."""
+    query = select(Student)
+    if q:
+        pattern = f"{escape_like(q)}%"
+        query = query.where(or_(*(column.like(pattern, escape="\\") for column in SEARCH_COLUMNS)))
+    if cursor:
+        query = query.where(after_cursor(cursor))
+    query = query.order_by(Student.last_name, Student.first_name, Student.id).limit(limit + 1)
+
+    students = list(db.scalars(query))
+    if len(students) <= limit:
+        return students, None
+    students = students[:limit]
+    return students, encode_cursor(students[-1])
@@ -0,0 +1,79 @@
+"""
+Годовые сводки занятий (student_year_summaries).
+
+Сводка пересчитывается из lesson_records одним INSERT … SELECT … GROUP BY с upsert
+для затронутых пар (студент, год) — в той же транзакции, что и сохранение занятий.
+Агрегат по паре — не больше 12 строк по уникальному индексу, поэтому пересчёт дешёвый
+и, в отличие от инкрементов, не расходится с данными при перезаписи месяца.
+Для диалектов без upsert (не MySQL и не SQLite) агрегаты пишутся построчно.
+"""
+
+from sqlalchemy import func, select, true, tuple_
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import LessonRecord, StudentYearSummary
+
+SUMMARY_FIELDS = ("hours_total", "months_recorded", "last_month", "updated_at")
+
+
+def _aggregate_select():
+    return select(
+        LessonRecord.student_id,
+        LessonRecord.year,
+        func.sum(LessonRecord.hours_studied),
+        func.count(LessonRecord.id),
+        func.max(LessonRecord.month),
+        func.now(),
+    ).group_by(LessonRecord.student_id, LessonRecord.year)
+
+
+def _upsert_from_select(db: Session, query) -> None:
+    columns = ["student_id", "year", *SUMMARY_FIELDS]
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(StudentYearSummary).from_select(columns, query)
+        stmt = stmt.on_duplicate_key_update(**{field: stmt.inserted[field] for field in SUMMARY_FIELDS})
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(StudentYearSummary).from_select(columns, query)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StudentYearSummary.student_id, StudentYearSummary.year],
+            set_={field: stmt.excluded[field] for field in SUMMARY_FIELDS},
+        )
+    else:
+        # Прочие диалекты: агрегаты читаются и записываются по строке (SELECT, затем UPDATE/INSERT)
+        for student_id, year, *aggregates in db.execute(query).all():
+            summary = db.get(StudentYearSummary, (student_id, year), with_for_update=True)
+            if summary is None:
+                summary = StudentYearSummary(student_id=student_id, year=year)
+                db.add(summary)
+            for field, value in zip(SUMMARY_FIELDS, aggregates):
+                setattr(summary, field, value)
+        db.flush()
+        return
+    db.execute(stmt)
+
+
+def refresh_year_summaries(db: Session, keys: set[tuple[int, int]]) -> None:
+    """Пересчитать сводки для пар (student_id, year). Commit — за вызывающим кодом."""
+    if not keys:
+        return
+    if len(keys) == 1:
+        ((student_id, year),) = keys
+        condition = (LessonRecord.student_id == student_id) & (LessonRecord.year == year)
+    else:
+        condition = tuple_(LessonRecord.student_id, LessonRecord.year).in_(sorted(keys))
+    _upsert_from_select(db, _aggregate_select().where(condition))
+
+
+def backfill_year_summaries(db: Session) -> None:
+    """Построить сводки по всем занятиям (первый запуск с новой таблицей)."""
+    # WHERE обязателен: иначе SQLite не отличит ON CONFLICT от условия JOIN
+    _upsert_from_select(db, _aggregate_select().where(true()))
+
+
+def get_year_summaries(db: Session, student_id: int, year: int | None = None) -> list[StudentYearSummary]:
+    query = select(StudentYearSummary).where(StudentYearSummary.student_id == student_id)
+    if year is not None:
+        query = query.where(StudentYearSummary.year == year)
+    return list(db.scalars(query.order_by(StudentYearSummary.year)))
@@ -0,0 +1,179 @@
+"""
+Кэш скомпилированного шаблона отчёта (report_template.docx).
+
+Шаблон читается с диска один раз и компилируется. Основной способ подстановки
+(report_template_engine=ooxml) — прямое переписывание XML частей, см. app/services/ooxml.py.
+Для python-docx (report_template_engine=docx) строится «план подстановки»: список мест
+(часть документа + путь индексов от корня XML до параграфа), где встречаются
+плейсхолдеры [[ key ]]. Документ разбирается один раз; при рендере берётся его
+глубокая копия (copy.deepcopy, примерно вдвое быстрее повторного разбора .docx),
+и заменяется текст только в этих параграфах — без полного обхода документа.
+Всё пересобирается автоматически, если у файла шаблона изменился mtime.
+python-docx импортируется только для плана python-docx, а не при старте приложения.
+"""
+
+import copy
+import hashlib
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+from app.config import get_settings
+from app.metrics import report_template_cache_total, report_template_compile_seconds
+from app.services.ooxml import OoxmlTemplate, compile_ooxml
+
+if TYPE_CHECKING:
+    from docx.document import Document
+    from docx.text.paragraph import Paragraph
+
+# Плейсхолдеры в шаблоне: [[ имя_переменной ]]
+PLACEHOLDER_PATTERN = re.compile(r"\[\[\s*(\w+)\s*\]\]")
+
+
+def iter_placeholder_paragraphs(doc: "Document") -> Iterator["Paragraph"]:
+    """Параграфы с плейсхолдерами: тело, ячейки таблиц, верхние и нижние колонтитулы."""
+    for para in doc.paragraphs:
+        if PLACEHOLDER_PATTERN.search(para.text):
+            yield para
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                for para in cell.paragraphs:
+                    if PLACEHOLDER_PATTERN.search(para.text):
+                        yield para
+    for section in doc.sections:
+        try:
+            if section.header is not None:
+                for para in section.header.paragraphs:
+                    if PLACEHOLDER_PATTERN.search(para.text):
+                        yield para
+        except Exception:
+            pass
+        try:
+            if section.footer is not None:
+                for para in section.footer.paragraphs:
+                    if PLACEHOLDER_PATTERN.search(para.text):
+                        yield para
+        except Exception:
+            pass
+
+
+def _element_path(element, root) -> tuple[int, ...]:
+    """Путь индексов дочерних элементов от root до element."""
+    path = []
+    while element is not root:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+    return tuple(reversed(path))
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """Шаблон в памяти и места плейсхолдеров в нём."""
+
+    path: Path
+    mtime_ns: int
+    data: bytes
+    version: str  # sha256 содержимого файла шаблона
+    ooxml: OoxmlTemplate
+
+    @cached_property
+    def targets(self) -> tuple[tuple[str, tuple[int, ...]], ...]:
+        """План для python-docx: (имя части, путь до w:p); строится при первом обращении."""
+        return _docx_targets(self.data)
+
+    @cached_property
+    def _document(self) -> "Document":
+        """Разобранный шаблон — только источник копий, сам не изменяется."""
+        import docx
+
+        return docx.Document(BytesIO(self.data))
+
+    def new_document(self) -> "Document":
+        """Свежая копия шаблона: глубокая копия разобранного документа, без разбора .docx."""
+        return copy.deepcopy(self._document)
+
+    def placeholder_paragraphs(self, doc: "Document") -> Iterator["Paragraph"]:
+        """Параграфы с плейсхолдерами в копии, полученной через new_document()."""
+        from docx.text.paragraph import Paragraph
+
+        parts = {str(part.partname): part for part in doc.part.package.iter_parts()}
+        for partname, path in self.targets:
+            part = parts[partname]
+            element = part.element
+            for index in path:
+                element = element[index]
+            yield Paragraph(element, part)
+
+
+def compile_template(path: Path) -> CompiledTemplate:
+    """Прочитать шаблон и скомпилировать подстановку в XML."""
+    mtime_ns = path.stat().st_mtime_ns
+    data = path.read_bytes()
+    return CompiledTemplate(
+        path=path,
+        mtime_ns=mtime_ns,
+        data=data,
+        version=hashlib.sha256(data).hexdigest(),
+        ooxml=compile_ooxml(data, PLACEHOLDER_PATTERN),
+    )
+
+
+def _docx_targets(data: bytes) -> tuple[tuple[str, tuple[int, ...]], ...]:
+    """Найти все параграфы с плейсхолдерами (python-docx)."""
+    import docx  # тяжёлый импорт (lxml) — только для подстановки через python-docx
+
+    doc = docx.Document(BytesIO(data))
+    targets: dict[tuple[str, tuple[int, ...]], None] = {}
+    for para in iter_placeholder_paragraphs(doc):
+        part = para.part
+        # dict вместо set: порядок сохраняется, повторы (объединённые ячейки,
+        # общий колонтитул у нескольких секций) отбрасываются
+        targets[(str(part.partname), _element_path(para._p, part.element))] = None
+    return tuple(targets)
+
+
+def get_template_path() -> Path:
+    settings = get_settings()
+    base_dir = Path(__file__).resolve().parent.parent.parent
+    return base_dir / settings.templates_dir / settings.report_template_name
+
+
+_compiled: CompiledTemplate | None = None
+_lock = threading.Lock()
+
+
+def get_compiled_template() -> CompiledTemplate:
+    """
+    Скомпилированный шаблон из кэша; перекомпиляция при изменении mtime файла.
+    FileNotFoundError, если шаблона нет.
+    """
+    global _compiled
+    path = get_template_path()
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Report template not found: {path}") from None
+
+    compiled = _compiled
+    if compiled is not None and compiled.path == path and compiled.mtime_ns == mtime_ns:
+        report_template_cache_total.labels(result="hit").inc()
+        return compiled
+
+    with _lock:
+        compiled = _compiled
+        if compiled is None or compiled.path != path or compiled.mtime_ns != mtime_ns:
+            report_template_cache_total.labels(result="miss").inc()
+            start = time.perf_counter()
+            compiled = compile_template(path)
+            report_template_compile_seconds.observe(time.perf_counter() - start)
+            _compiled = compiled
+        else:
+            report_template_cache_total.labels(result="hit").inc()
+    return compiled
@@ -0,0 +1,132 @@
+"""
+Воркер пула конвертации (см. app/services/converter.py).
+
+Запускается системным python3 с модулем uno (пакет python3-uno), а не интерпретатором
+приложения, поэтому не импортирует ничего из app.*. Держит один процесс soffice (headless)
+и конвертирует документы в PDF по командам из stdin.
+
+Протокол — одна JSON-строка на сообщение:
+  воркер -> пул: {"ready": true} после подключения к soffice (или {"ready": false, "error": ...});
+  пул -> воркер: {"files": ["/tmp/.../report.docx", ...], "outdir": "/tmp/..."};
+  воркер -> пул: {"ok": true} или {"ok": false, "error": "..."}.
+PDF сохраняется в outdir под именем исходного файла с расширением .pdf.
+При закрытии stdin воркер завершает soffice и выходит.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+
+
+def _prop(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+def _send(message: dict) -> None:
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def _connect(pipe_name: str, timeout: float):
+    """Дождаться, пока soffice откроет pipe, и получить Desktop."""
+    local_ctx = uno.getComponentContext()
+    resolver = local_ctx.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_ctx
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            ctx = resolver.resolve(f"uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext")
+            return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+        except NoConnectException:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def _convert(desktop, src: str, outdir: str) -> None:
+    doc = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(src),
+        "_blank",
+        0,
+        (_prop("Hidden", True), _prop("ReadOnly", True)),
+    )
+    if doc is None:
+        raise RuntimeError(f"cannot load {src}")
+    try:
+        name = os.path.splitext(os.path.basename(src))[0] + ".pdf"
+        doc.storeToURL(
+            uno.systemPathToFileUrl(os.path.join(outdir, name)),
+            (_prop("FilterName", "writer_pdf_Export"),),
+        )
+    finally:
+        doc.close(True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--soffice", default="libreoffice")
+    parser.add_argument("--profile", required=True)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    pipe_name = f"report_converter_{os.getpid()}"
+    soffice = subprocess.Popen(
+        [
+            args.soffice,
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--nodefault",
+            "--norestore",
+            "--nolockcheck",
+            f"-env:UserInstallation={uno.systemPathToFileUrl(args.profile)}",
+            f"--accept=pipe,name={pipe_name};urp;StarOffice.ComponentContext",
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    desktop = None
+    try:
+        try:
+            desktop = _connect(pipe_name, args.startup_timeout)
+        except Exception as e:
+            _send({"ready": False, "error": str(e) or type(e).__name__})
+            return
+        _send({"ready": True})
+
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                for src in request["files"]:
+                    _convert(desktop, src, request["outdir"])
+                _send({"ok": True})
+            except Exception as e:
+                _send({"ok": False, "error": str(e) or type(e).__name__})
+    finally:
+        if desktop is not None:
+            try:
+                desktop.terminate()
+            except Exception:
+                pass
+        try:
+            soffice.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            soffice.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Бенчмарки backend (запуск из каталога backend: python -m benchmarks.<имя>)."""
@@ -0,0 +1,262 @@
+"""
+Нагрузочный бенчмарк API без внешних сервисов: пропускная способность и p50/p95/p99.
+
+Приложение app.main:app запускается в этом же процессе (lifespan и все middleware),
+запросы идут через httpx.ASGITransport — без сети. Вместо MySQL — временная SQLite
+(DB_URL), вместо LibreOffice — поддельный конвертер (скрипт, который пишет
+минимальный PDF после задержки --converter-delay-ms). Перед замером в БД
+добавляются --students студентов с --months записями занятий у каждого.
+
+Нагрузки (--workload, по умолчанию все):
+- students_list — GET /api/students (кэшированный список);
+- students_page — GET /api/students?limit=50;
+- lesson_get — GET /api/lessons;
+- lesson_post — POST /api/lessons (upsert существующей записи);
+- report_pdf — GET /api/report/pdf (кэш PDF выключен, если не задан --report-cache).
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_api --output bench-results.json
+    python -m benchmarks.bench_api --baseline bench-results.json --threshold 15
+С --baseline печатается сравнение с сохранённым результатом; если p95 какой-либо
+нагрузки хуже базового больше чем на --threshold процентов, код выхода — 1.
+Код выхода 1 и при любом ответе не 2xx: иначе замер тихо превращается в замер отказов
+(429/503 допуска к отчётам и т.п.). Лимит клиента на отчёты в бенчмарке выключен,
+слотов допуска — --report-concurrency, очередь вмещает все параллельные запросы.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+FAKE_CONVERTER = """#!{python}
+import os, sys, time
+time.sleep({delay})
+args = sys.argv[1:]
+out_dir = args[args.index("--outdir") + 1]
+for path in args[args.index("--outdir") + 2:]:
+    name = os.path.splitext(os.path.basename(path))[0] + ".pdf"
+    with open(os.path.join(out_dir, name), "wb") as f:
+        f.write(b"%PDF-1.4\\n% benchmark\\n%%EOF\\n")
+"""
+
+WORKLOADS = ("students_list", "students_page", "lesson_get", "lesson_post", "report_pdf")
+YEAR = 2025
+DEFAULT_CONCURRENCY = [1, 10, 50]
+
+
+def configure_environment(tmp: Path, args) -> None:
+    """Настройки приложения — до импорта app (get_settings кэшируется)."""
+    converter = tmp / "libreoffice"
+    converter.write_text(FAKE_CONVERTER.format(python=sys.executable, delay=args.converter_delay_ms / 1000))
+    converter.chmod(converter.stat().st_mode | stat.S_IEXEC)
+    os.environ.update(
+        {
+            "DB_URL": f"sqlite:///{tmp / 'bench.sqlite'}",
+            "LIBREOFFICE_BINARY": str(converter),
+            "CONVERTER_POOL_SIZE": "0",
+            "REPORT_ENGINE": "libreoffice",
+            "TEMP_DIR": str(tmp),
+            "LOG_LEVEL": "WARNING",
+            "DB_POOL_SIZE": str(args.pool_size),
+            # Допуск к отчётам: без лимита на клиента (все запросы — с одного адреса),
+            # очередь и ожидание — на всю нагрузку, чтобы не было 429/503
+            "REPORT_RATE_PER_MINUTE": "0",
+            "REPORT_MAX_CONCURRENCY": str(args.report_concurrency),
+            "REPORT_QUEUE_DEPTH": str(max(args.concurrency or DEFAULT_CONCURRENCY)),
+            "REPORT_QUEUE_TIMEOUT": "600",
+        }
+    )
+    if not args.report_cache:
+        os.environ["REPORT_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["REPORT_CACHE_DISK_ENABLED"] = "false"
+
+
+def seed(students: int, months: int) -> list[int]:
+    """Студенты и занятия за YEAR; вернуть id студентов с записями."""
+    from app.database import get_session_factory
+    from app.models import LessonRecord, Student
+    from app.services.student_cache import invalidate_student_list
+    from app.services.summary import backfill_year_summaries
+
+    with get_session_factory()() as session:
+        created = [Student(first_name=f"Student{i:05d}", last_name=f"Bench{i % 97:02d}") for i in range(students)]
+        session.add_all(created)
+        session.flush()
+        session.add_all(
+            LessonRecord(
+                student_id=student.id,
+                year=YEAR,
+                month=month,
+                grammar_e="Present Perfect",
+                reading_e="Short stories",
+                speaking_e="Travel",
+                writing_e="Letter",
+                hours_studied=month % 8 + 1,
+            )
+            for student in created
+            for month in range(1, months + 1)
+        )
+        backfill_year_summaries(session)
+        session.commit()
+        ids = [student.id for student in created]
+    invalidate_student_list()
+    return ids
+
+
+def build_request(workload: str, i: int, student_ids: list[int], months: int) -> tuple[str, str, dict]:
+    """Метод, путь и аргументы httpx для i-го запроса нагрузки."""
+    student_id = student_ids[i % len(student_ids)]
+    month = i % months + 1
+    lesson = {"student_id": student_id, "year": YEAR, "month": month}
+    if workload == "students_list":
+        return "GET", "/api/students", {}
+    if workload == "students_page":
+        return "GET", "/api/students", {"params": {"limit": 50}}
+    if workload == "lesson_get":
+        return "GET", "/api/lessons", {"params": lesson}
+    if workload == "lesson_post":
+        return "POST", "/api/lessons", {"json": {**lesson, "grammar_e": f"Revision {i}", "hours_studied": i % 8 + 1}}
+    if workload == "report_pdf":
+        return "GET", "/api/report/pdf", {"params": lesson}
+    raise ValueError(f"Unknown workload: {workload}")
+
+
+async def run_load(client, workload: str, requests: int, concurrency: int, student_ids: list[int], months: int) -> dict:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            method, path, kwargs = build_request(workload, i, student_ids, months)
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    return {
+        "workload": workload,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "statuses": statuses,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+async def main_async(args) -> list[dict]:
+    import httpx
+
+    from app.main import app
+
+    results = []
+    async with app.router.lifespan_context(app):
+        student_ids = await asyncio.to_thread(seed, args.students, args.months)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for workload in args.workload or WORKLOADS:
+                # Прогрев: шаблон, кэш списка студентов, соединения пула
+                await run_load(client, workload, min(args.warmup, args.requests), 1, student_ids, args.months)
+                for concurrency in args.concurrency or DEFAULT_CONCURRENCY:
+                    results.append(
+                        await run_load(client, workload, args.requests, concurrency, student_ids, args.months)
+                    )
+    return results
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> tuple[list[dict], bool]:
+    """Изменения относительно базового прогона (в процентах); True — есть регрессия p95."""
+    base = {(r["workload"], r["concurrency"]): r for r in baseline["results"]}
+    rows = []
+    regressed = False
+    for result in results:
+        before = base.get((result["workload"], result["concurrency"]))
+        if before is None:
+            continue
+
+        def change(key: str) -> float | None:
+            return round((result[key] - before[key]) / before[key] * 100, 1) if before[key] else None
+
+        row = {
+            "workload": result["workload"],
+            "concurrency": result["concurrency"],
+            "rps_change_pct": change("rps"),
+            "p50_change_pct": change("p50_ms"),
+            "p95_change_pct": change("p95_ms"),
+            "p99_change_pct": change("p99_ms"),
+        }
+        row["regression"] = row["p95_change_pct"] is not None and row["p95_change_pct"] > threshold
+        regressed |= row["regression"]
+        rows.append(row)
+    return rows, regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", action="append", choices=WORKLOADS, help="по умолчанию все")
+    parser.add_argument("--requests", type=int, default=500, help="запросов на каждую нагрузку и concurrency")
+    parser.add_argument("--concurrency", type=int, action="append", help="по умолчанию 1, 10, 50")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--months", type=int, default=12, choices=range(1, 13), metavar="1..12")
+    parser.add_argument("--converter-delay-ms", type=float, default=50.0, help="время «конвертации» одного отчёта")
+    parser.add_argument("--report-cache", action="store_true", help="не выключать кэш готовых PDF")
+    parser.add_argument("--pool-size", type=int, default=5, help="DB_POOL_SIZE")
+    parser.add_argument("--report-concurrency", type=int, default=4, help="REPORT_MAX_CONCURRENCY")
+    parser.add_argument("--output", type=Path, help="сохранить результат (JSON) — например, как базовый")
+    parser.add_argument("--baseline", type=Path, help="сравнить с сохранённым результатом")
+    parser.add_argument("--threshold", type=float, default=10.0, help="допустимый рост p95, %%")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_api_") as tmp:
+        configure_environment(Path(tmp), args)
+        results = asyncio.run(main_async(args))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "students": args.students,
+            "months": args.months,
+            "converter_delay_ms": args.converter_delay_ms,
+            "report_cache": args.report_cache,
+            "pool_size": args.pool_size,
+            "report_concurrency": args.report_concurrency,
+        },
+        "results": results,
+    }
+    regressed = False
+    if args.baseline:
+        report["comparison"], regressed = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    print(text)
+    failed = [f"{r['workload']} c={r['concurrency']}: {r['statuses']}" for r in results if r["errors"]]
+    for line in failed:
+        print(f"Non-2xx responses: {line}", file=sys.stderr)
+    if regressed or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
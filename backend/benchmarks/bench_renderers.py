@@ -0,0 +1,82 @@
+"""
+Сравнение движков PDF-отчёта: libreoffice (шаблон .docx + конвертация) и native.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_renderers --runs 20
+Движок libreoffice пропускается, если LibreOffice не найден.
+Пул конвертеров запускается так же, как в приложении (CONVERTER_POOL_SIZE).
+"""
+
+import argparse
+import json
+import statistics
+import time
+from types import SimpleNamespace
+
+from app.services.converter import start_converter_pool, stop_converter_pool
+from app.services.renderers import RENDERERS
+from app.services.report import get_report_context
+
+
+def sample_context() -> dict:
+    student = SimpleNamespace(
+        first_name="Адели",
+        last_name="Рабинович",
+        first_name_he="אדל",
+        last_name_he="רבינוביץ'",
+    )
+    record = SimpleNamespace(
+        student=student,
+        year=2025,
+        month=3,
+        grammar_e="Present Perfect vs Past Simple, irregular verbs",
+        reading_e="Short stories: The Gift of the Magi",
+        speaking_e="Travel, weather, describing people",
+        writing_e="Informal letter to a friend",
+        hours_studied=8,
+    )
+    return get_report_context(record)
+
+
+def bench(name: str, runs: int, context: dict) -> dict:
+    renderer = RENDERERS[name]
+    if not renderer.available():
+        return {"engine": name, "skipped": "not available"}
+    # Первый рендер отдельно: холодный старт (импорты, шрифты, запуск воркера)
+    start = time.perf_counter()
+    size = len(renderer.render(context))
+    cold = time.perf_counter() - start
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        renderer.render(context)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "engine": name,
+        "runs": runs,
+        "pdf_bytes": size,
+        "cold_ms": round(cold * 1000, 2),
+        "mean_ms": round(statistics.mean(timings) * 1000, 2),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--engine", action="append", choices=sorted(RENDERERS), help="по умолчанию — все")
+    args = parser.parse_args()
+
+    context = sample_context()
+    start_converter_pool()
+    try:
+        results = [bench(name, args.runs, context) for name in args.engine or sorted(RENDERERS)]
+    finally:
+        stop_converter_pool()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Сериализация ответов по эндпоинтам: прежний путь против нового.
+
+before  — как было: проверка строк БД схемой response_model (serialize_response FastAPI,
+          from_attributes) и JSONResponse (json.dumps); для полного списка студентов —
+          TypeAdapter.dump_json при заполнении кэша, для /api/lessons/grid — json.dumps.
+orjson  — row_serializer (dict из атрибутов ORM без валидации) и ORJSONResponse.
+msgpack — то же, но MsgPackResponse (Accept: application/msgpack).
+
+Строки — объекты моделей SQLAlchemy в памяти (без БД): измеряется только сериализация
+тела ответа. Для каждого варианта — время на ответ (среднее, p50, p95), размер тела
+и ускорение относительно before.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_serialization --students 1000 --runs 200
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import TypeAdapter
+
+from app.http_serialization import MsgPackResponse, row_serializer
+from app.models import LessonRecord, Student
+from app.schemas import LessonRecordResponse, StudentResponse
+from app.services.lesson_grid import GRID_COLUMNS
+
+PAGE_SIZE = 50
+
+
+def make_students(count: int) -> list[Student]:
+    return [
+        Student(
+            id=i,
+            first_name=f"Имя{i}",
+            last_name=f"Фамилия{i}",
+            first_name_he=f"שם{i}",
+            last_name_he=f"משפחה{i}",
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def make_lessons(students: list[Student], year: int) -> list[LessonRecord]:
+    return [
+        LessonRecord(
+            id=student.id * 12 + month,
+            student_id=student.id,
+            year=year,
+            month=month,
+            grammar_e="Хорошо",
+            reading_e="Отлично",
+            speaking_e="Удовлетворительно",
+            writing_e="Хорошо",
+            hours_studied=month % 12 + 1,
+        )
+        for student in students
+        for month in range(1, 13)
+    ]
+
+
+def make_grid(lessons: list[LessonRecord], year: int) -> dict:
+    grid = {"year": year, "count": len(lessons)}
+    for column in GRID_COLUMNS:
+        grid[column] = [getattr(record, column) for record in lessons]
+    return grid
+
+
+def response_model_path(type_, name: str):
+    """Прежний путь обработчика с response_model: проверка схемой и json.dumps."""
+    field = create_model_field(name=name, type_=type_, mode="serialization")
+
+    async def render(content) -> bytes:
+        return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+    return render
+
+
+def cases(students: list[Student], lessons: list[LessonRecord], grid: dict) -> dict:
+    student_row = row_serializer(StudentResponse)
+    lesson_row = row_serializer(LessonRecordResponse)
+    list_adapter = TypeAdapter(list[StudentResponse])
+    page = students[:PAGE_SIZE]
+
+    async def students_list_before(rows):
+        return list_adapter.dump_json(list_adapter.validate_python(rows, from_attributes=True))
+
+    async def grid_before(content):
+        return JSONResponse(content).body
+
+    def new_path(response_class, convert):
+        async def render(content) -> bytes:
+            return response_class(convert(content)).body
+
+        return render
+
+    def rows(serialize):
+        return lambda items: [serialize(item) for item in items]
+
+    return {
+        "GET /api/students": (students, {
+            "before": students_list_before,
+            "orjson": new_path(ORJSONResponse, rows(student_row)),
+            "msgpack": new_path(MsgPackResponse, rows(student_row)),
+        }),
+        f"GET /api/students?limit={PAGE_SIZE}": (page, {
+            "before": response_model_path(list[StudentResponse], "students_page"),
+            "orjson": new_path(ORJSONResponse, rows(student_row)),
+            "msgpack": new_path(MsgPackResponse, rows(student_row)),
+        }),
+        "GET /api/students/{id}": (students[0], {
+            "before": response_model_path(StudentResponse, "student"),
+            "orjson": new_path(ORJSONResponse, student_row),
+            "msgpack": new_path(MsgPackResponse, student_row),
+        }),
+        "GET /api/lessons": (lessons[0], {
+            "before": response_model_path(LessonRecordResponse | None, "lesson"),
+            "orjson": new_path(ORJSONResponse, lesson_row),
+            "msgpack": new_path(MsgPackResponse, lesson_row),
+        }),
+        "GET /api/lessons/grid": (grid, {
+            "before": grid_before,
+            "orjson": new_path(ORJSONResponse, lambda content: content),
+            "msgpack": new_path(MsgPackResponse, lambda content: content),
+        }),
+    }
+
+
+async def bench(render, content, runs: int) -> dict:
+    size = len(await render(content))  # прогрев
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await render(content)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "bytes": size,
+        "mean_us": round(statistics.mean(timings) * 1e6, 1),
+        "p50_us": round(timings[len(timings) // 2] * 1e6, 1),
+        "p95_us": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1e6, 1),
+    }
+
+
+async def main_async(args) -> list[dict]:
+    students = make_students(args.students)
+    lessons = make_lessons(students, args.year)
+    grid = make_grid(lessons, args.year)
+    results = []
+    for endpoint, (content, variants) in cases(students, lessons, grid).items():
+        measured = {name: await bench(render, content, args.runs) for name, render in variants.items()}
+        before = measured["before"]["mean_us"]
+        for name, result in measured.items():
+            result["speedup"] = round(before / result["mean_us"], 2) if result["mean_us"] else None
+        results.append({"endpoint": endpoint, **measured})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=1000, help="Студентов в списке (записей в grid — ×12)")
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--runs", type=int, default=200, help="Повторов на вариант")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
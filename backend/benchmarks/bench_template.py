@@ -0,0 +1,72 @@
+"""
+Подстановка в шаблон .docx: python-docx (объектная модель) против прямой записи XML (ooxml).
+
+Для каждого способа: время одного заполнения с записью .docx в память (среднее, p50,
+p95) и пиковый объём памяти, выделенной за одно заполнение (tracemalloc). Шаблон
+компилируется заранее — как в приложении, где он берётся из кэша.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_template --runs 200
+"""
+
+import argparse
+import io
+import json
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.bench_renderers import sample_context
+from app.services.report import _render_compiled_template
+from app.services.template import get_compiled_template
+
+
+def fill_docx(context: dict) -> bytes:
+    buffer = io.BytesIO()
+    _render_compiled_template(context).save(buffer)
+    return buffer.getvalue()
+
+
+def fill_ooxml(context: dict) -> bytes:
+    template = get_compiled_template().ooxml
+    buffer = io.BytesIO()
+    template.write(template.render_parts(context), buffer)
+    return buffer.getvalue()
+
+
+def bench(name: str, fill, runs: int, context: dict) -> dict:
+    size = len(fill(context))  # прогрев: ленивые импорты и план python-docx
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fill(context)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    tracemalloc.start()
+    fill(context)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "engine": name,
+        "runs": runs,
+        "docx_bytes": size,
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    context = sample_context()
+    results = [bench("docx", fill_docx, args.runs, context), bench("ooxml", fill_ooxml, args.runs, context)]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Допуск к формированию отчётов: token bucket, очередь слотов, таймауты."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.admission import AdmissionRejected, ReportAdmission, TokenBucket
+
+
+def make_admission(**overrides) -> ReportAdmission:
+    options = dict(max_concurrency=1, queue_depth=1, queue_timeout=1.0, rate_per_minute=0, burst=1)
+    options.update(overrides)
+    return ReportAdmission(**options)
+
+
+def test_token_bucket_burst_then_wait():
+    bucket = TokenBucket(rate=1.0, burst=2)
+    assert bucket.take("a") == 0
+    assert bucket.take("a") == 0
+    assert 0 < bucket.take("a") <= 1.0
+    # У другого клиента свой запас
+    assert bucket.take("b") == 0
+
+
+def test_token_bucket_refund_restores_token():
+    bucket = TokenBucket(rate=0.001, burst=1)
+    assert bucket.take("a") == 0
+    assert bucket.take("a") > 0
+    bucket.refund("a")
+    bucket.refund("a")  # не больше burst
+    assert bucket.take("a") == 0
+    assert bucket.take("a") > 0
+
+
+def test_token_bucket_forgets_oldest_clients():
+    bucket = TokenBucket(rate=0.001, burst=1, max_clients=2)
+    for key in ("a", "b", "c"):
+        assert bucket.take(key) == 0
+    # «a» вытеснен — снова полный запас
+    assert bucket.take("a") == 0
+
+
+def test_rate_limited_is_429():
+    admission = make_admission(rate_per_minute=1, burst=1)
+    admission.check_rate("client")
+    with pytest.raises(AdmissionRejected) as exc_info:
+        admission.check_rate("client")
+    assert exc_info.value.reason == "rate_limited"
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.retry_after >= 1
+
+
+def test_queue_full_is_503():
+    async def scenario():
+        admission = make_admission(queue_depth=0)
+        acquired_at = await admission.acquire()
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await admission.acquire()
+        admission.release(acquired_at)
+        return exc_info.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == "queue_full"
+    assert rejected.status_code == 503
+
+
+def test_queue_timeout_frees_queue_place():
+    async def scenario():
+        admission = make_admission(queue_timeout=0.05)
+        acquired_at = await admission.acquire()
+        with pytest.raises(AdmissionRejected, match="Timed out"):
+            await admission.acquire()
+        admission.release(acquired_at)
+        # Ушедший по таймауту не держит ни слот, ни место в очереди
+        admission.release(await admission.acquire())
+
+    asyncio.run(scenario())
+
+
+def test_released_slot_goes_to_waiter():
+    async def scenario():
+        admission = make_admission()
+        acquired_at = await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        admission.release(acquired_at)
+        admission.release(await asyncio.wait_for(waiter, 1))
+
+    asyncio.run(scenario())
+
+
+def test_slot_refunds_token_when_queue_is_full():
+    async def scenario():
+        admission = make_admission(queue_depth=0, rate_per_minute=1, burst=1)
+        acquired_at = await admission.acquire()
+        with pytest.raises(AdmissionRejected, match="queue is full"):
+            async with admission.slot("client"):
+                pass
+        admission.release(acquired_at)
+        # Токен вернулся — следующая попытка не упирается в лимит клиента
+        async with admission.slot("client"):
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_check_capacity():
+    admission = make_admission(queue_depth=1, queue_timeout=5)
+    admission.check_capacity()
+    acquired_at = admission.acquire_blocking()
+    thread = threading.Thread(target=lambda: admission.release(admission.acquire_blocking()))
+    thread.start()
+    while not admission._waiters:
+        time.sleep(0.001)
+    with pytest.raises(AdmissionRejected, match="queue is full"):
+        admission.check_capacity()
+    admission.release(acquired_at)
+    thread.join(1)
+    admission.check_capacity()
+
+
+def test_blocking_acquire_is_bounded():
+    admission = make_admission(queue_depth=0, queue_timeout=0.05)
+    acquired_at = admission.acquire_blocking()
+    with pytest.raises(AdmissionRejected, match="queue is full"):
+        admission.acquire_blocking()
+    admission.release(acquired_at)
+
+    admission = make_admission(queue_depth=1, queue_timeout=0.05)
+    acquired_at = admission.acquire_blocking()
+    start = time.monotonic()
+    with pytest.raises(AdmissionRejected, match="Timed out"):
+        admission.acquire_blocking()
+    assert time.monotonic() - start < 1
+    assert not admission._waiters
+    admission.release(acquired_at)
+
+
+def test_blocking_waiter_gets_slot_from_event_loop_holder():
+    results = []
+
+    async def scenario():
+        admission = make_admission(queue_timeout=5)
+        acquired_at = await admission.acquire()
+        thread = threading.Thread(target=lambda: results.append(admission.acquire_blocking()))
+        thread.start()
+        while not admission._waiters:
+            await asyncio.sleep(0.001)
+        admission.release(acquired_at)
+        await asyncio.to_thread(thread.join, 1)
+        admission.release(results[0])
+
+    asyncio.run(scenario())
+    assert len(results) == 1
@@ -0,0 +1,111 @@
+"""Протокол пула конвертеров: чтение ответов воркера и перезапуски (без LibreOffice)."""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from app.services import converter
+from app.services.converter import ConversionFailed, ConverterError, ConverterPool
+
+# Поддельный uno_worker.py: режим — в аргументе --soffice
+FAKE_WORKER = r'''
+import json
+import sys
+import time
+
+mode = sys.argv[sys.argv.index("--soffice") + 1]
+
+
+def send(raw):
+    sys.stdout.write(raw)
+    sys.stdout.flush()
+
+
+send('{"ready": true}\n')
+for line in sys.stdin:
+    files = json.loads(line)["files"]
+    if mode == "partial":
+        send('{"ok": tr')
+        time.sleep(1)
+    elif mode == "garbage":
+        send("not json\n")
+    elif any("bad" in name for name in files):
+        send('{"ok": false, "error": "bad document"}\n')
+    else:
+        # Ответ приходит двумя записями — строка собирается из частей
+        send('{"ok"')
+        time.sleep(0.05)
+        send(': true}\n')
+'''
+
+
+@pytest.fixture
+def make_pool(tmp_path, monkeypatch):
+    script = tmp_path / "fake_worker.py"
+    script.write_text(FAKE_WORKER)
+    monkeypatch.setattr(converter, "WORKER_SCRIPT", script)
+    pools = []
+
+    def make(mode: str, timeout: float = 5.0) -> ConverterPool:
+        pool = ConverterPool(
+            size=1,
+            queue_depth=1,
+            timeout=timeout,
+            max_conversions=100,
+            python=sys.executable,
+            soffice=mode,
+            profile_root=tmp_path,
+        )
+        pool.start()
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.stop()
+
+
+def _pid(pool: ConverterPool) -> int:
+    return pool._workers[0]._proc.pid
+
+
+def test_reply_split_across_writes(make_pool, tmp_path):
+    pool = make_pool("ok")
+    pool.convert([Path("a.docx")], tmp_path)
+    pool.convert([Path("b.docx")], tmp_path)
+    assert pool._workers[0].conversions == 2
+
+
+def test_partial_line_times_out_by_deadline(make_pool, tmp_path):
+    pool = make_pool("partial", timeout=0.3)
+    pool._workers[0]._read_message(5)  # {"ready": true}
+    pool._workers[0]._ready = True
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        pool._workers[0].convert([Path("a.docx")], tmp_path, 0.3)
+    assert time.monotonic() - start < 0.9
+
+
+def test_document_error_keeps_worker(make_pool, tmp_path):
+    pool = make_pool("ok")
+    pool.convert([Path("a.docx")], tmp_path)
+    pid = _pid(pool)
+    with pytest.raises(ConversionFailed, match="bad document"):
+        pool.convert([Path("bad.docx")], tmp_path)
+    assert _pid(pool) == pid
+    pool.convert([Path("c.docx")], tmp_path)
+    assert _pid(pool) == pid
+
+
+def test_protocol_error_restarts_worker(make_pool, tmp_path):
+    pool = make_pool("garbage")
+    pool._workers[0]._read_message(5)
+    pool._workers[0]._ready = True
+    pid = _pid(pool)
+    with pytest.raises(ConverterError) as exc_info:
+        pool.convert([Path("a.docx")], tmp_path)
+    assert not isinstance(exc_info.value, ConversionFailed)
+    assert _pid(pool) != pid
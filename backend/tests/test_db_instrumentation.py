@@ -0,0 +1,40 @@
+"""Отпечатки SQL и учёт запросов HTTP-запроса для признака N+1."""
+
+from sqlalchemy import create_engine, text
+
+from app.db_instrumentation import (
+    batched_statements,
+    fingerprint,
+    instrument_statements,
+    start_request_stats,
+)
+
+
+def test_fingerprint_strips_values():
+    assert fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'O''Brien'") == (
+        "SELECT * FROM t WHERE id = ? AND name = ?"
+    )
+    assert fingerprint("SELECT id FROM t WHERE id IN (%s, %s, %s)") == "SELECT id FROM t WHERE id IN (?)"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?)") == "INSERT INTO t (a, b) VALUES (?, ?)"
+    assert fingerprint("SELECT  1\n  FROM   t") == "SELECT ? FROM t"
+
+
+def test_long_fingerprints_keep_distinct_tails():
+    head = "SELECT " + ", ".join(f"col_{i}" for i in range(60)) + " FROM t "
+    first, second = fingerprint(head + "ORDER BY a"), fingerprint(head + "ORDER BY b")
+    assert first != second
+    assert len(first) <= 200
+
+
+def test_batched_statements_are_counted_but_not_repeats():
+    engine = create_engine("sqlite://")
+    instrument_statements(engine)
+    stats = start_request_stats()
+    with engine.connect() as connection:
+        for _ in range(3):
+            connection.execute(text("SELECT 1"))
+        with batched_statements():
+            for _ in range(5):
+                connection.execute(text("SELECT 2"))
+    assert stats.count == 8
+    assert stats.by_fingerprint == {"SELECT ?": 3}
@@ -0,0 +1,70 @@
+"""Диапазоны Range: разбор заголовка и ответ из байтов в памяти."""
+
+import pytest
+from starlette.requests import Request
+
+from app.http_files import bytes_response, parse_byte_range
+
+DATA = bytes(range(100))
+ETAG = '"abc"'
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=90-", (90, 99)),
+        ("bytes=95-200", (95, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=-500", (0, 99)),
+        (" bytes=5-5 ", (5, 5)),
+    ],
+)
+def test_parse_byte_range(header, expected):
+    assert parse_byte_range(header, len(DATA)) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,5-6", "items=0-1", "bytes=-", "bytes=a-b", "bytes"])
+def test_unsupported_range_is_ignored(header):
+    assert parse_byte_range(header, len(DATA)) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=10-5", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, len(DATA))
+
+
+def make_request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def respond(**headers):
+    return bytes_response(make_request(**headers), DATA, "application/pdf", {"ETag": ETAG})
+
+
+def test_full_response_advertises_ranges():
+    response = respond()
+    assert response.status_code == 200
+    assert response.body == DATA
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_partial_response():
+    response = respond(range="bytes=10-19")
+    assert response.status_code == 206
+    assert response.body == DATA[10:20]
+    assert response.headers["content-range"] == "bytes 10-19/100"
+    assert response.headers["etag"] == ETAG
+
+
+def test_unsatisfiable_response():
+    response = respond(range="bytes=200-")
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
+
+
+def test_if_range_mismatch_returns_full_body():
+    assert respond(range="bytes=0-9", if_range='"other"').status_code == 200
+    assert respond(range="bytes=0-9", if_range=ETAG).status_code == 206
@@ -0,0 +1,67 @@
+"""Разбор тела массового импорта занятий: строки NDJSON и CSV по частям."""
+
+import asyncio
+
+from app.services import lesson_import
+from app.services.lesson_import import ImportRow, iter_csv_rows, iter_ndjson_rows, validate_row
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def collect(parser, *chunks: bytes) -> list[ImportRow]:
+    async def run():
+        return [row async for row in parser(_chunks(*chunks))]
+
+    return asyncio.run(run())
+
+
+def test_ndjson_lines_split_across_chunks():
+    rows = collect(iter_ndjson_rows, b'\xef\xbb\xbf{"a": 1}\n{"a"', b': 2}\r\n\n[1]\nnot json\n{"a": 3}')
+    assert [(row.line, row.data) for row in rows if row.error is None] == [
+        (1, {"a": 1}),
+        (2, {"a": 2}),
+        (6, {"a": 3}),
+    ]
+    assert [(row.line, row.error.split(":")[0]) for row in rows if row.error] == [
+        (4, "Expected a JSON object"),
+        (5, "Invalid JSON"),
+    ]
+
+
+def test_too_long_line_is_an_error_of_that_line(monkeypatch):
+    monkeypatch.setattr(lesson_import, "MAX_LINE_BYTES", 8)
+    rows = collect(iter_ndjson_rows, b'{"a": 1}\n', b"x" * 6, b"x" * 6, b'\n{"b": 2}\n')
+    assert [(row.line, row.data or row.error) for row in rows] == [
+        (1, {"a": 1}),
+        (2, "Line is too long"),
+        (3, {"b": 2}),
+    ]
+
+
+def test_csv_header_quotes_and_empty_cells():
+    rows = collect(
+        iter_csv_rows,
+        b"student_id,year,month,grammar_e\n1,2025,3,\"good,\n",
+        b'very good"\n2,2025\n3,2025,4,\n',
+    )
+    assert [(row.line, row.data or row.error) for row in rows] == [
+        (2, {"student_id": "1", "year": "2025", "month": "3", "grammar_e": "good,\nvery good"}),
+        (4, "Expected 4 columns, got 2"),
+        (5, {"student_id": "3", "year": "2025", "month": "4"}),
+    ]
+
+
+def test_csv_unterminated_quote():
+    rows = collect(iter_csv_rows, b'student_id\n"1\n')
+    assert [(row.line, row.error) for row in rows] == [(2, "Unterminated quoted field")]
+
+
+def test_validate_row():
+    assert validate_row(ImportRow(1, error="Line is too long")) == ["Line is too long"]
+    errors = validate_row(ImportRow(1, data={"student_id": 1, "year": 2025, "month": 13}))
+    assert isinstance(errors, list) and errors[0].startswith("month:")
+    record = validate_row(ImportRow(1, data={"student_id": "1", "year": "2025", "month": "3"}))
+    assert (record.student_id, record.year, record.month) == (1, 2025, 3)
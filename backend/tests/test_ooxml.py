@@ -0,0 +1,82 @@
+"""Подстановка плейсхолдеров прямо в XML частей .docx."""
+
+import io
+import zipfile
+
+from app.services.ooxml import compile_ooxml, compile_part, escape_text
+from app.services.template import PLACEHOLDER_PATTERN
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def document(body: str) -> str:
+    return f'<?xml version="1.0" encoding="UTF-8"?><w:document {W}><w:body>{body}</w:body></w:document>'
+
+
+def make_docx(parts: dict[str, str]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        for name, xml in parts.items():
+            archive.writestr(name, xml)
+        archive.writestr("word/styles.xml", "<w:styles/>")
+    return buffer.getvalue()
+
+
+def test_escape_text():
+    assert escape_text("a & <b>") == "a &amp; &lt;b&gt;"
+    assert escape_text("bell\x07") == "bell"
+    assert escape_text("1\r\n2\t3") == (
+        '1</w:t><w:br/><w:t xml:space="preserve">2</w:t><w:tab/><w:t xml:space="preserve">3'
+    )
+
+
+def test_placeholder_split_across_runs_keeps_first_run_formatting():
+    xml = document(
+        "<w:p><w:r><w:rPr><w:b/></w:rPr><w:t>Hello [[ na</w:t></w:r>"
+        "<w:r><w:t>me ]]!</w:t></w:r></w:p>"
+    )
+    part = compile_part("word/document.xml", xml, PLACEHOLDER_PATTERN)
+    assert part.keys == ("name",)
+    rendered = part.render({"name": b"Bob"}).decode()
+    assert '<w:rPr><w:b/></w:rPr><w:t xml:space="preserve">Hello Bob</w:t>' in rendered
+    assert '<w:t xml:space="preserve">!</w:t>' in rendered
+    assert "[[" not in rendered and "me ]]" not in rendered
+
+
+def test_part_without_placeholders_is_unchanged():
+    xml = document("<w:p><w:r><w:t>[not a placeholder]</w:t></w:r></w:p><w:p/>")
+    part = compile_part("word/document.xml", xml, PLACEHOLDER_PATTERN)
+    assert part.keys == ()
+    assert part.render({}) == xml.encode("utf-8")
+
+
+def test_nested_paragraphs_and_missing_values():
+    xml = document(
+        "<w:tbl><w:tr><w:tc><w:p><w:r><w:t>[[a]]</w:t></w:r></w:p></w:tc>"
+        '<w:tc><w:p><w:r><w:t xml:space="preserve"> [[b]] and [[a]]</w:t></w:r></w:p></w:tc></w:tr></w:tbl>'
+    )
+    part = compile_part("word/document.xml", xml, PLACEHOLDER_PATTERN)
+    assert part.keys == ("a", "b", "a")
+    rendered = part.render({"a": b"1"}).decode()
+    assert '<w:t xml:space="preserve">1</w:t>' in rendered
+    assert '<w:t xml:space="preserve">  and 1</w:t>' in rendered
+
+
+def test_compiled_template_writes_docx():
+    data = make_docx({
+        "word/document.xml": document("<w:p><w:r><w:t>[[student]] — [[hours]]</w:t></w:r></w:p>"),
+        "word/header1.xml": f"<w:hdr {W}><w:p><w:r><w:t>[[month]]</w:t></w:r></w:p></w:hdr>",
+    })
+    template = compile_ooxml(data, PLACEHOLDER_PATTERN)
+    assert template.placeholder_count == 3
+
+    output = io.BytesIO()
+    template.write(template.render_parts({"student": "A & B", "hours": 3, "month": None}), output)
+    with zipfile.ZipFile(output) as archive, zipfile.ZipFile(io.BytesIO(data)) as source:
+        assert sorted(archive.namelist()) == sorted(source.namelist())
+        assert archive.read("word/styles.xml") == source.read("word/styles.xml")
+        body = archive.read("word/document.xml").decode()
+        header = archive.read("word/header1.xml").decode()
+    assert "A &amp; B — 3" in body
+    assert '<w:t xml:space="preserve"></w:t>' in header
@@ -0,0 +1,116 @@
+"""Кэш готовых PDF: LRU в памяти, дисковый уровень, сброс по записи занятия."""
+
+import os
+
+import pytest
+
+from app.services.pdf_cache import PdfCache, make_cache_key
+
+RECORD = (1, 2025, 3)
+
+
+@pytest.fixture
+def disk_dir(tmp_path):
+    return tmp_path / "report_cache"
+
+
+def new_dir_factory(tmp_path):
+    created = []
+
+    def new_dir():
+        path = tmp_path / f"pin_{len(created)}"
+        path.mkdir()
+        created.append(path)
+        return path
+
+    return new_dir, created
+
+
+def test_cache_key_depends_on_context_and_template():
+    context = {"name": "A", "hours": 2}
+    assert make_cache_key(context, "v1") == make_cache_key(dict(reversed(context.items())), "v1")
+    assert make_cache_key(context, "v1") != make_cache_key(context, "v2")
+    assert make_cache_key(context, "v1") != make_cache_key({**context, "hours": 3}, "v1")
+
+
+def test_memory_lru_limits_entries_and_bytes():
+    cache = PdfCache(max_entries=2, max_bytes=10)
+    cache.put("a", RECORD, b"1234")
+    cache.put("b", RECORD, b"1234")
+    assert cache.get("a") == b"1234"  # «a» теперь самый свежий
+    cache.put("c", RECORD, b"1234")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    cache.put("d", RECORD, b"12345678")  # по размеру вытесняет остальные
+    assert cache.get("d") == b"12345678"
+    assert cache.get("a") is None and cache.get("c") is None
+    cache.put("big", RECORD, b"x" * 11)  # больше уровня — не кэшируется
+    assert cache.get("big") is None
+
+
+def test_invalidate_drops_memory_and_disk(disk_dir):
+    cache = PdfCache(max_entries=4, max_bytes=1024, disk_dir=disk_dir, disk_max_bytes=1024)
+    cache.put("a", RECORD, b"pdf-a")
+    cache.put("b", (2, 2025, 3), b"pdf-b")
+    cache.invalidate(*RECORD)
+    assert cache.get("a") is None
+    assert cache.get("b") == b"pdf-b"
+    assert [path.name for path in disk_dir.iterdir()] == ["2_2025_3_b.pdf"]
+
+
+def test_lookup_disk_hit_survives_eviction(disk_dir, tmp_path):
+    cache = PdfCache(max_entries=0, max_bytes=0, disk_dir=disk_dir, disk_max_bytes=10)
+    cache.put("a", RECORD, b"12345")
+    new_dir, created = new_dir_factory(tmp_path)
+    pinned = cache.lookup("a", new_dir)
+    assert pinned.parent == created[0]
+    # Новая запись вытесняет «a» с диска, но выданный файл остаётся целым
+    cache.put("b", RECORD, b"1234567890")
+    assert not (disk_dir / "1_2025_3_a.pdf").exists()
+    assert pinned.read_bytes() == b"12345"
+
+
+def test_lookup_memory_hit_and_miss_create_no_dir(disk_dir, tmp_path):
+    cache = PdfCache(max_entries=4, max_bytes=1024, disk_dir=disk_dir, disk_max_bytes=1024)
+    cache.put("a", RECORD, b"pdf")
+    new_dir, created = new_dir_factory(tmp_path)
+    assert cache.lookup("a", new_dir) == b"pdf"
+    assert cache.lookup("missing", new_dir) is None
+    assert created == []
+
+
+def test_lookup_file_removed_behind_cache_is_miss(disk_dir, tmp_path):
+    cache = PdfCache(max_entries=0, max_bytes=0, disk_dir=disk_dir, disk_max_bytes=1024)
+    cache.put("a", RECORD, b"pdf")
+    (disk_dir / "1_2025_3_a.pdf").unlink()
+    new_dir, created = new_dir_factory(tmp_path)
+    assert cache.lookup("a", new_dir) is None
+    assert created == []
+    assert cache.lookup("a", new_dir) is None
+
+
+def test_disk_index_is_restored_with_records(disk_dir):
+    cache = PdfCache(max_entries=0, max_bytes=0, disk_dir=disk_dir, disk_max_bytes=1024)
+    cache.put("a", RECORD, b"pdf-a")
+    cache.put("b", (2, 2025, 3), b"pdf-b")
+    (disk_dir / "legacykey.pdf").write_bytes(b"old")
+
+    restarted = PdfCache(max_entries=0, max_bytes=0, disk_dir=disk_dir, disk_max_bytes=1024)
+    # Файл без записи в имени не сбросить — удалён при загрузке
+    assert not (disk_dir / "legacykey.pdf").exists()
+    assert restarted.get("a") == b"pdf-a"
+    restarted.invalidate(*RECORD)
+    assert restarted.get("a") is None
+    assert sorted(os.listdir(disk_dir)) == ["2_2025_3_b.pdf"]
+
+
+def test_disk_index_evicts_oldest_over_limit(disk_dir):
+    cache = PdfCache(max_entries=0, max_bytes=0, disk_dir=disk_dir, disk_max_bytes=1024)
+    cache.put("a", RECORD, b"x" * 6)
+    cache.put("b", RECORD, b"y" * 6)
+    old = disk_dir / "1_2025_3_a.pdf"
+    os.utime(old, (1, 1))
+
+    restarted = PdfCache(max_entries=0, max_bytes=0, disk_dir=disk_dir, disk_max_bytes=10)
+    assert restarted.get("a") is None
+    assert restarted.get("b") == b"y" * 6
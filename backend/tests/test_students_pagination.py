@@ -0,0 +1,85 @@
+"""Постраничный список студентов: курсор и условие keyset на SQLite в памяти."""
+
+import base64
+import json
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import Student
+from app.services.students import decode_cursor, encode_cursor, list_students_page
+
+NAMES = [
+    ("Коэн", "Анна"),
+    ("Коэн", "Анна"),  # полный тёзка — различается только id
+    ("Коэн", "Борис"),
+    ("Леви", "Анна"),
+    ("Абрамов", "Илья"),
+    ("Леви", "Анна"),
+    ("100%_ok", "Тест"),
+]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Student.__table__])
+    with Session(engine) as session:
+        session.add_all(Student(last_name=last, first_name=first) for last, first in NAMES)
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def _raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    student = Student(id=7, last_name="כהן", first_name="Анна")
+    assert decode_cursor(encode_cursor(student)) == ("כהן", "Анна", 7)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["!!!", _raw_cursor({"a": 1}), _raw_cursor(["a", "b"]), _raw_cursor(["a", "b", "3"]), _raw_cursor([1, "b", 3])],
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_list_once_in_order(db):
+    students = db.scalars(select(Student)).all()
+    expected = [s.id for s in sorted(students, key=lambda s: (s.last_name, s.first_name, s.id))]
+    seen, cursor = [], None
+    while True:
+        page, cursor = list_students_page(db, 2, cursor)
+        seen += [s.id for s in page]
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+def test_last_full_page_has_no_cursor(db):
+    page, cursor = list_students_page(db, len(NAMES))
+    assert len(page) == len(NAMES)
+    assert cursor is None
+
+
+def test_prefix_search_escapes_like_wildcards(db):
+    page, _ = list_students_page(db, 10, q="Ко")
+    assert {s.last_name for s in page} == {"Коэн"}
+    page, _ = list_students_page(db, 10, q="100%_")
+    assert [s.last_name for s in page] == ["100%_ok"]
+    page, _ = list_students_page(db, 10, q="_")
+    assert page == []
+
+
+def test_search_pages_with_cursor(db):
+    first, cursor = list_students_page(db, 2, q="Анна")
+    rest, tail = list_students_page(db, 10, cursor, q="Анна")
+    assert tail is None
+    assert len({s.id for s in first + rest}) == 4